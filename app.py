@@ -1,578 +1,4989 @@
+import argparse
+import asyncio
+import atexit
+import builtins
+import cProfile
+import gzip
+import heapq
+import json
 import logging
+import mmap
+import multiprocessing
+import os
+import pickle
+import queue
+import shutil
+import signal
+import sqlite3
+import sys
+import threading
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter, deque
 from contextlib import contextmanager
+from dataclasses import dataclass, field
 from datetime import datetime, time, timedelta
-from typing import List, Dict, Optional, Callable
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from operator import attrgetter
+from types import SimpleNamespace
+from typing import (
+    TYPE_CHECKING,
+    List,
+    Dict,
+    Iterator,
+    Optional,
+    Callable,
+    Sequence,
+    Tuple,
+)
 import random
+import re
 import time as time_module
 
 import yaml
 
-from instapy import InstaPy, smart_run
-from instapy.xpath_compile import xpath
-from selenium.common import TimeoutException, WebDriverException, NoSuchElementException
-from webdriver_manager.firefox import GeckoDriverManager
-
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s | %(levelname)s | %(funcName)s | %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-    handlers=[logging.FileHandler("instabot.log"), logging.StreamHandler()],
+# selenium.common only defines exception classes and is cheap to import;
+# instapy and webdriver_manager pull in the whole browser stack and are
+# imported on first use by InstaPyBackend.
+from selenium.common import (
+    exceptions as selenium_exceptions,
+    NoSuchElementException,
+    StaleElementReferenceException,
+    TimeoutException,
+    WebDriverException,
 )
 
-xpath["login_user"] = {"login_elem_no_such_exception_2", "//div[text()='Log In']"}
+if TYPE_CHECKING:
+    from instapy import InstaPy
+
+LOG_FORMAT = "%(asctime)s | %(levelname)s | %(funcName)s | %(message)s"
+LOG_DATEFMT = "%Y-%m-%d %H:%M:%S"
+
+logger = logging.getLogger('instabot')
+config_logger = logging.getLogger('instabot.config')
+schedule_logger = logging.getLogger('instabot.schedule')
+targets_logger = logging.getLogger('instabot.targets')
+session_logger = logging.getLogger('instabot.session')
+metrics_logger = logging.getLogger('instabot.metrics')
+ledger_logger = logging.getLogger('instabot.ledger')
+profile_logger = logging.getLogger('instabot.profile')
+replay_logger = logging.getLogger('instabot.replay')
+
+
+class CompressingRotatingFileHandler(RotatingFileHandler):
+    """Rotates when the file exceeds ``max_bytes`` or is older than
+    ``rotate_every`` seconds, gzipping the rotated files.
+
+    The age of an existing file survives restarts: it counts from the last
+    rollover (the newest backup's mtime) or, without backups, from the
+    file's own mtime.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        max_bytes: int = 0,
+        backup_count: int = 0,
+        rotate_every: int = 0,
+    ):
+        super().__init__(
+            filename,
+            maxBytes=max_bytes,
+            backupCount=backup_count,
+            encoding='utf-8',
+            delay=True,
+        )
+        self.rotate_every = rotate_every
+        self.namer = lambda name: name + '.gz'
+        self.rotator = self._compress
+        self.rollover_at = self._started() + rotate_every
+
+    def _started(self) -> float:
+        """When the current log file was begun, as far as the disk tells."""
+        if not os.path.exists(self.baseFilename):
+            return time_module.time()
+        for path in (
+            self.rotation_filename(self.baseFilename + '.1'),
+            self.baseFilename,
+        ):
+            try:
+                return os.path.getmtime(path)
+            except OSError:
+                continue
+        return time_module.time()
+
+    @staticmethod
+    def _compress(source: str, dest: str):
+        with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.remove(source)
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self.rotate_every and time_module.time() >= self.rollover_at:
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self):
+        super().doRollover()
+        self.rollover_at = time_module.time() + self.rotate_every
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Formats each record as one compact JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': self.formatTime(record, LOG_DATEFMT),
+            'level': record.levelname,
+            'logger': record.name,
+            'func': record.funcName,
+            'msg': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, separators=(',', ':'), default=str)
+
+
+_log_listener: Optional[QueueListener] = None
+
+
+def setup_logging(settings: Optional['LoggingSettings'] = None) -> QueueListener:
+    """Route all logging through a queue drained by a background listener.
+
+    ``QueueHandler.prepare`` still formats each message (and any traceback)
+    on the calling thread; only the writes to disk and stderr, and file
+    rotation, move to the listener thread. Calling this again (for example
+    once the config is loaded) replaces the previous setup.
+    """
+    global _log_listener
+    settings = settings or LoggingSettings()
+
+    if settings.format == 'json':
+        formatter = JsonLinesFormatter()
+    else:
+        formatter = logging.Formatter(LOG_FORMAT, LOG_DATEFMT)
+
+    handlers = [logging.StreamHandler()]
+    if settings.file:
+        handlers.append(
+            CompressingRotatingFileHandler(
+                settings.file,
+                max_bytes=settings.max_bytes,
+                backup_count=settings.backup_count,
+                rotate_every=settings.rotate_every,
+            )
+        )
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    if _log_listener is not None:
+        _log_listener.stop()
+    else:
+        atexit.register(lambda: _log_listener and _log_listener.stop())
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.handlers = [QueueHandler(log_queue)]
+    root.setLevel(settings.level)
+    for name, level in settings.levels:
+        logging.getLogger(name).setLevel(level)
+
+    _log_listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _log_listener.start()
+    return _log_listener
+
+
+def logging_configured() -> bool:
+    return _log_listener is not None
 
 
 class ConfigError(Exception):
     pass
 
 
-class Config:
-    def __init__(self, config_path: str = 'config.yaml'):
-        logging.info(f"Initializing configuration from {config_path}")
-        try:
-            with open(config_path, 'r', encoding='utf-8') as f:
-                logging.debug(f"Reading configuration file: {config_path}")
-                config = yaml.safe_load(f)
+ENV_PLACEHOLDER = re.compile(r'\$\{(\w+)\}')
+
+
+def expand_env(value):
+    """Replace ``${VAR}`` placeholders in every string of a loaded YAML tree."""
+    if isinstance(value, dict):
+        return {key: expand_env(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [expand_env(item) for item in value]
+    if isinstance(value, str):
+
+        def lookup(match):
+            name = match.group(1)
+            if name not in os.environ:
+                config_logger.warning("Environment variable %s is not set", name)
+                return match.group(0)
+            return os.environ[name]
+
+        return ENV_PLACEHOLDER.sub(lookup, value)
+    return value
+
+
+def parse_clock(value: str) -> int:
+    """Parse ``HH:MM`` into seconds since midnight."""
+    try:
+        hours, minutes = str(value).split(':')
+        hours, minutes = int(hours), int(minutes)
+    except ValueError:
+        raise ConfigError(f"Invalid time {value!r}, expected HH:MM")
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        raise ConfigError(f"Invalid time {value!r}, expected HH:MM")
+    return hours * 3600 + minutes * 60
+
+
+def build(cls, data: Optional[Dict], section: str):
+    """Instantiate a settings dataclass from an optional config mapping."""
+    try:
+        return cls(**(data or {}))
+    except TypeError as e:
+        raise ConfigError(f"Invalid {section} configuration: {str(e)}")
+
+
+# Session mode for each hour of the day.
+SESSION_MODES = tuple(
+    (
+        'sleepy'
+        if hour >= 22 or hour < 6
+        else 'active' if hour in (12, 13, 19, 20, 21) else 'normal'
+    )
+    for hour in range(24)
+)
+WEEKEND_LIMIT_FACTOR = 1.5
+# Follows younger than this are never unfollowed.
+UNFOLLOW_AFTER = 48 * 60 * 60
+
+
+@dataclass(frozen=True, slots=True)
+class HourlyLimits:
+    follows: int
+    unfollows: int
+    likes: int
+    comments: int
+
+    def __post_init__(self):
+        for name in ('follows', 'unfollows', 'likes', 'comments'):
+            value = getattr(self, name)
+            if not isinstance(value, int) or value < 0:
+                raise ConfigError(f"Hourly limit {name} must be a non-negative int")
+
+    def scaled(self, factor: float) -> 'HourlyLimits':
+        return HourlyLimits(
+            int(self.follows * factor),
+            int(self.unfollows * factor),
+            int(self.likes * factor),
+            int(self.comments * factor),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class RelationshipBounds:
+    max_followers: int
+    min_followers: int
+    min_following: int
+    min_posts: int
+    max_following: int
+    max_posts: int
+
+    def __post_init__(self):
+        if self.min_followers > self.max_followers:
+            raise ConfigError("min_followers is greater than max_followers")
+        if self.min_following > self.max_following:
+            raise ConfigError("min_following is greater than max_following")
+        if self.min_posts > self.max_posts:
+            raise ConfigError("min_posts is greater than max_posts")
+
+
+@dataclass(frozen=True, slots=True)
+class ActiveHours:
+    """Active windows as ``(start, end)`` seconds since midnight."""
+
+    weekday: Tuple[Tuple[int, int], ...]
+    weekend: Tuple[Tuple[int, int], ...]
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'ActiveHours':
+        def window(period: Dict) -> Tuple[int, int]:
+            start, end = parse_clock(period['start']), parse_clock(period['end'])
+            if start > end:
+                raise ConfigError(f"Active window {period} ends before it starts")
+            return start, end
+
+        weekday = data['weekday']
+        return cls(
+            weekday=tuple(
+                window(weekday[period]) for period in ('morning', 'lunch', 'evening')
+            ),
+            weekend=(window(data['weekend']),),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class BreakWindow:
+    hour_start: int
+    hour_end: int
+
+    def __post_init__(self):
+        if not 0 <= self.hour_start <= self.hour_end <= 23:
+            raise ConfigError(f"Invalid break hours {self.hour_start}-{self.hour_end}")
+
+
+@dataclass(frozen=True, slots=True)
+class Breaks:
+    bathroom: Tuple[BreakWindow, ...]
+    bathroom_duration: Tuple[int, int]
+    lunch: BreakWindow
+    lunch_duration: Tuple[int, int]
+
+    PERIODS = ('morning', 'afternoon', 'evening')
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Breaks':
+        def duration(section: Dict) -> Tuple[int, int]:
+            low, high = section['duration']['min'], section['duration']['max']
+            if low > high:
+                raise ConfigError(f"Break duration min {low} exceeds max {high}")
+            return low, high
+
+        bathroom = data['bathroom']
+        lunch = data['lunch']
+        return cls(
+            bathroom=tuple(
+                BreakWindow(
+                    bathroom[period]['hour_start'], bathroom[period]['hour_end']
+                )
+                for period in cls.PERIODS
+            ),
+            bathroom_duration=duration(bathroom),
+            lunch=BreakWindow(lunch['hour_start'], lunch['hour_end']),
+            lunch_duration=duration(lunch),
+        )
+
+    def duration(self, kind: str) -> Tuple[int, int]:
+        return self.lunch_duration if kind == 'lunch' else self.bathroom_duration
+
+
+def load_target_file(path: str) -> Dict[str, float]:
+    """Read one target per line as ``name [weight]``; ``#`` starts a comment."""
+    targets: Dict[str, float] = {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for number, line in enumerate(f, 1):
+                fields = line.split('#', 1)[0].split()
+                if not fields:
+                    continue
+                try:
+                    weight = float(fields[1]) if len(fields) > 1 else 1.0
+                except ValueError:
+                    raise ConfigError(f"{path}:{number}: invalid weight {fields[1]!r}")
+                if weight <= 0:
+                    raise ConfigError(f"{path}:{number}: weight must be positive")
+                targets[fields[0]] = weight
+    except OSError as e:
+        raise ConfigError(f"Cannot read target file {path}: {str(e)}")
+    return targets
+
+
+@dataclass(frozen=True, slots=True)
+class Targets:
+    """Targeting lists, with hashtag categories flattened and deduplicated.
+
+    Targets listed in ``targeting.files`` are appended to the inline lists;
+    ``weights`` only holds entries whose weight differs from ``1.0``.
+    """
+
+    hashtags: Tuple[str, ...]
+    accounts: Tuple[str, ...]
+    locations: Tuple[str, ...]
+    weights: Dict[str, Dict[str, float]] = field(default_factory=dict)
+
+    KINDS = ('hashtags', 'accounts', 'locations')
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Targets':
+        inline = {
+            'hashtags': [tag for tags in data['hashtags'].values() for tag in tags],
+            'accounts': data['accounts'],
+            'locations': data['locations'],
+        }
+        files = data.get('files') or {}
+        unknown = set(files) - set(cls.KINDS)
+        if unknown:
+            raise ConfigError(f"Unknown target files: {sorted(unknown)}")
+
+        names, weights = {}, {}
+        for kind in cls.KINDS:
+            loaded = dict.fromkeys(inline[kind], 1.0)
+            if files.get(kind):
+                loaded.update(load_target_file(files[kind]))
+            names[kind] = tuple(loaded)
+            weights[kind] = {
+                name: weight for name, weight in loaded.items() if weight != 1.0
+            }
+        return cls(**names, weights=weights)
+
+    def weights_for(self, kind: str) -> Tuple[float, ...]:
+        weights = self.weights.get(kind, {})
+        return tuple(weights.get(name, 1.0) for name in getattr(self, kind))
+
+
+@dataclass(frozen=True, slots=True)
+class TargetCooldown:
+    """When a target is benched for producing too little, too slowly."""
+
+    min_samples: int = 3
+    min_yield: float = 1.0
+    max_seconds_per_interaction: float = 120.0
+    duration: float = 6 * 3600
+
+
+@dataclass(frozen=True, slots=True)
+class BrowserSettings:
+    geckodriver_path: str = ''
+    driver_cache: str = '.geckodriver_path'
+    offline: bool = False
+    lean: bool = False
+    profile_dir: str = '.browser_profile'
+    memory_cache_kb: int = 65536
+    blocked_hosts: Tuple[str, ...] = ()
+    page_stats: bool = True
+
+    def __post_init__(self):
+        object.__setattr__(self, 'blocked_hosts', tuple(self.blocked_hosts or ()))
+
+
+@dataclass(frozen=True, slots=True)
+class LoggingSettings:
+    level: str = 'INFO'
+    format: str = 'text'
+    file: str = 'instabot.log'
+    max_bytes: int = 10 * 1024 * 1024
+    rotate_every: int = 24 * 3600
+    backup_count: int = 7
+    levels: Tuple[Tuple[str, str], ...] = ()
+
+    def __post_init__(self):
+        if isinstance(self.levels, dict):
+            object.__setattr__(self, 'levels', tuple(self.levels.items()))
+        if self.format not in ('text', 'json'):
+            raise ConfigError(f"Unknown log format {self.format!r}")
+
+
+@dataclass(frozen=True, slots=True)
+class MetricsSettings:
+    host: str = '127.0.0.1'
+    port: int = 0
+    file: str = ''
+
+
+@dataclass(frozen=True, slots=True)
+class LedgerSettings:
+    path: str = 'instabot.db'
+    batch_size: int = 20
+    flush_interval: float = 60.0
+
+
+@dataclass(frozen=True, slots=True)
+class ProfileCacheSettings:
+    enabled: bool = True
+    path: str = 'profiles.db'
+    ttl: float = 7 * 24 * 3600
+    max_entries: int = 50000
+
+
+@dataclass(frozen=True, slots=True)
+class PageWaitSettings:
+    enabled: bool = True
+    min_wait: float = 2.0
+    max_wait: float = 10.0
+    min_page_load: float = 15.0
+    max_page_load: float = 60.0
+    margin: float = 2.0
+    window: int = 200
+    smoothing: float = 0.2
+    min_samples: int = 20
+    fallback_seconds: float = 900.0
+
+    def __post_init__(self):
+        if not 0 < self.min_wait <= self.max_wait:
+            raise ConfigError("waits.min_wait must be positive and <= max_wait")
+        if not 0 < self.min_page_load <= self.max_page_load:
+            raise ConfigError(
+                "waits.min_page_load must be positive and <= max_page_load"
+            )
+
+
+@dataclass(frozen=True, slots=True)
+class ReloadSettings:
+    enabled: bool = True
+    interval: float = 5.0
+
+
+@dataclass(frozen=True, slots=True)
+class RecoverySettings:
+    action_backoff_base: float = 30.0
+    action_backoff_cap: float = 600.0
+    session_backoff_base: float = 60.0
+    session_backoff_cap: float = 1800.0
+    breaker_threshold: int = 3
+    breaker_cooldown: float = 900.0
+    breaker_max_cooldown: float = 4 * 3600
+    max_retries: int = 8
+
+    def __post_init__(self):
+        if self.breaker_threshold < 1 or self.max_retries < 1:
+            raise ConfigError("breaker_threshold and max_retries must be at least 1")
+
+
+@dataclass(frozen=True, slots=True)
+class MemorySettings:
+    enabled: bool = True
+    soft_limit_mb: int = 1200
+    hard_limit_mb: int = 2000
+    timeline_file: str = ''
+    timeline_size: int = 1000
+
+    def __post_init__(self):
+        if self.soft_limit_mb > self.hard_limit_mb:
+            raise ConfigError("memory.soft_limit_mb is greater than hard_limit_mb")
+
+
+@dataclass(frozen=True, slots=True)
+class ProfilingSettings:
+    enabled: bool = False
+    mode: str = 'sampling'
+    interval: float = 0.005
+    output_dir: str = 'profiles'
+    keep: int = 50
+
+    def __post_init__(self):
+        if self.mode not in Profiler.MODES:
+            raise ConfigError(f"Unknown profiling mode {self.mode!r}")
+        if self.keep < 1:
+            raise ConfigError("profiling.keep must be at least 1")
+
+
+@dataclass(frozen=True, slots=True)
+class DecisionSettings:
+    enabled: bool = True
+    seed: Optional[int] = None
+    output_dir: str = 'decisions'
+    keep: int = 30
+
+    def __post_init__(self):
+        if self.keep < 1:
+            raise ConfigError("decisions.keep must be at least 1")
+
+
+@dataclass(frozen=True, slots=True)
+class WorkerSettings:
+    enabled: bool = False
+    standby: bool = True
+    start_timeout: float = 180.0
+    takeover_delay: float = 5.0
+
+    def __post_init__(self):
+        if self.start_timeout <= 0 or self.takeover_delay < 0:
+            raise ConfigError(
+                "worker.start_timeout must be positive and takeover_delay not negative"
+            )
+
+
+@dataclass(frozen=True, slots=True)
+class RuntimeSettings:
+    shutdown_timeout: float = 20.0
+    export_interval: float = 60.0
+
+
+class Config:
+    """Validated, pre-compiled view of ``config.yaml``.
+
+    Everything the hot paths need is parsed up front: clock times become
+    seconds since midnight, hashtag categories a flat tuple and hourly
+    limits a lookup keyed by mode and weekend.
+    """
+
+    __slots__ = (
+        'path',
+        'username',
+        'password',
+        'max_daily_interactions',
+        'targets',
+        'target_cooldown',
+        'hourly_limits',
+        'session_limits',
+        'active_hours',
+        'breaks',
+        'relationship_bounds',
+        'browser',
+        'logging',
+        'metrics',
+        'ledger',
+        'reload',
+        'recovery',
+        'runtime',
+        'memory',
+        'profiling',
+        'profile_cache',
+        'decisions',
+        'waits',
+        'worker',
+    )
+
+    def __init__(self, config_path: str = 'config.yaml'):
+        config_logger.info("Initializing configuration from %s", config_path)
+        self.path = config_path
+        try:
+            with open(config_path, 'r', encoding='utf-8') as f:
+                config_logger.debug("Reading configuration file: %s", config_path)
+                config = expand_env(yaml.safe_load(f))
+
+            required_keys = ['auth', 'limits', 'targeting', 'engagement', 'schedule']
+            missing_keys = [key for key in required_keys if key not in config]
+            if missing_keys:
+                config_logger.error(
+                    "Configuration validation failed. Missing keys: %s", missing_keys
+                )
+                raise ConfigError(f"Missing required config keys: {missing_keys}")
+
+            config_logger.debug("Loading configuration values")
+            self.username = config['auth']['credentials']['username']
+            config_logger.info("Configured username: %s", self.username)
+            self.password = config['auth']['credentials']['password']
+            config_logger.debug("Password loaded (masked)")
+
+            self.max_daily_interactions = config['limits']['interactions']['max_daily']
+            config_logger.info(
+                "Maximum daily interactions set to: %s", self.max_daily_interactions
+            )
+
+            self.targets = Targets.from_dict(config['targeting'])
+            config_logger.info(
+                "Loaded %s locations, %s hashtags and %s accounts",
+                len(self.targets.locations),
+                len(self.targets.hashtags),
+                len(self.targets.accounts),
+            )
+            self.target_cooldown = build(
+                TargetCooldown, config['targeting'].get('cooldown'), 'cooldown'
+            )
+
+            self.hourly_limits = {
+                mode: HourlyLimits(**limits)
+                for mode, limits in config['engagement']['hourly_limits'].items()
+            }
+            self.session_limits = {
+                (mode, weekend): (
+                    limits.scaled(WEEKEND_LIMIT_FACTOR) if weekend else limits
+                )
+                for mode, limits in self.hourly_limits.items()
+                for weekend in (False, True)
+            }
+            missing_modes = set(SESSION_MODES) - set(self.hourly_limits)
+            if missing_modes:
+                raise ConfigError(f"Missing hourly limits for: {sorted(missing_modes)}")
+            config_logger.info(
+                "Hourly interaction limits configured: %s", self.hourly_limits
+            )
+
+            self.active_hours = ActiveHours.from_dict(
+                config['schedule']['active_hours']
+            )
+            config_logger.info("Active hours configured: %s", self.active_hours)
+
+            self.breaks = Breaks.from_dict(config['schedule']['breaks'])
+            config_logger.info("Break schedule loaded")
+
+            self.relationship_bounds = RelationshipBounds(
+                **config['limits']['relationship_bounds']
+            )
+            config_logger.info("Relationship bounds set: %s", self.relationship_bounds)
+
+            self.browser = build(BrowserSettings, config.get('browser'), 'browser')
+            config_logger.info("Browser settings: %s", self.browser)
+
+            self.logging = build(LoggingSettings, config.get('logging'), 'logging')
+            self.metrics = build(MetricsSettings, config.get('metrics'), 'metrics')
+            self.ledger = build(LedgerSettings, config.get('ledger'), 'ledger')
+            self.profile_cache = build(
+                ProfileCacheSettings, config.get('profile_cache'), 'profile_cache'
+            )
+            self.reload = build(ReloadSettings, config.get('reload'), 'reload')
+            self.recovery = build(RecoverySettings, config.get('recovery'), 'recovery')
+            self.runtime = build(RuntimeSettings, config.get('runtime'), 'runtime')
+            self.memory = build(MemorySettings, config.get('memory'), 'memory')
+            self.profiling = build(
+                ProfilingSettings, config.get('profiling'), 'profiling'
+            )
+            self.decisions = build(
+                DecisionSettings, config.get('decisions'), 'decisions'
+            )
+            self.waits = build(PageWaitSettings, config.get('waits'), 'waits')
+            self.worker = build(WorkerSettings, config.get('worker'), 'worker')
+
+            config_logger.info("Configuration loaded successfully")
+
+        except yaml.YAMLError as e:
+            config_logger.critical("Failed to parse YAML configuration: %s", e)
+            raise ConfigError(f"YAML parsing error: {str(e)}")
+        except KeyError as e:
+            config_logger.critical(
+                "Invalid configuration structure. Missing key: %s", e
+            )
+            raise ConfigError(f"Missing config key: {str(e)}")
+        except (TypeError, AttributeError) as e:
+            config_logger.critical("Invalid configuration structure: %s", e)
+            raise ConfigError(f"Invalid config structure: {str(e)}")
+        except FileNotFoundError as e:
+            config_logger.critical("Configuration file not found: %s", e)
+            raise ConfigError(f"Config file not found: {str(e)}")
+
+    def limits_for(self, mode: str, weekend: bool) -> HourlyLimits:
+        return self.session_limits[(mode, weekend)]
+
+
+class ConfigWatcher:
+    """Detects edits to the config file by polling its mtime and size.
+
+    A ``stat`` call every ``interval`` seconds is cheap enough to run from
+    the bot loop and works on every filesystem and bind mount.
+    """
+
+    def __init__(self, path: str, interval: float = 5.0):
+        self.path = path
+        self.interval = interval
+        self._stamp = self._stat()
+        self._next_check = 0.0
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def changed(self, now: float) -> bool:
+        if now < self._next_check:
+            return False
+        self._next_check = now + self.interval
+        stamp = self._stat()
+        if stamp is None or stamp == self._stamp:
+            return False
+        self._stamp = stamp
+        return True
+
+
+class Interrupted(Exception):
+    """Raised by :meth:`Clock.sleep` once shutdown has been requested."""
+
+
+class Clock:
+    """Source of wall-clock time and sleeps for every timing decision of the bot.
+
+    Sleeps wait on an event, so :meth:`interrupt` wakes any thread blocked in
+    :meth:`sleep` and makes it raise :class:`Interrupted`.
+    """
+
+    def __init__(self):
+        self.interrupted = threading.Event()
+
+    def now(self) -> datetime:
+        return datetime.now()
+
+    def monotonic(self) -> float:
+        return time_module.monotonic()
+
+    def sleep(self, seconds: float) -> None:
+        if self.interrupted.wait(max(seconds, 0)):
+            raise Interrupted()
+
+    async def wait(self, seconds: float, stop: asyncio.Event) -> bool:
+        """Sleep on the event loop; return ``True`` if ``stop`` was set."""
+        try:
+            await asyncio.wait_for(stop.wait(), max(seconds, 0))
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def interrupt(self):
+        self.interrupted.set()
+
+
+class VirtualClock(Clock):
+    """Clock whose sleeps fast-forward virtual time instead of blocking."""
+
+    def __init__(self, start: Optional[datetime] = None):
+        super().__init__()
+        self._now = start or datetime.now()
+        self._elapsed = 0.0
+
+    def now(self) -> datetime:
+        return self._now
+
+    def monotonic(self) -> float:
+        return self._elapsed
+
+    def sleep(self, seconds: float) -> None:
+        if self.interrupted.is_set():
+            raise Interrupted()
+        if seconds > 0:
+            self._now += timedelta(seconds=seconds)
+            self._elapsed += seconds
+
+    advance = sleep
+
+    async def wait(self, seconds: float, stop: asyncio.Event) -> bool:
+        await asyncio.sleep(0)
+        if not stop.is_set():
+            self.advance(seconds)
+        return stop.is_set()
+
+
+class ScheduleIndex:
+    """Interval index over the active hours and breaks of a schedule.
+
+    Times are compiled once into sorted, merged ``(start, end)`` intervals
+    expressed in seconds since midnight, so every lookup is a bisect.
+    """
+
+    DAY = 24 * 3600
+
+    def __init__(self, active_hours: ActiveHours, breaks: Dict, lunch_minutes: int):
+        self.weekday = self._compile(
+            [(start, end, 'active') for start, end in active_hours.weekday]
+        )
+        self.weekend = self._compile(
+            [(start, end, 'active') for start, end in active_hours.weekend]
+        )
+
+        break_intervals = [
+            (self._seconds(break_time), self._seconds(break_time) + 10 * 60, 'bathroom')
+            for break_time in breaks['bathroom']
+        ]
+        lunch_start = self._seconds(breaks['lunch'])
+        break_intervals.append((lunch_start, lunch_start + lunch_minutes * 60, 'lunch'))
+        self.breaks = self._compile(break_intervals)
+
+    @staticmethod
+    def _seconds(value: time) -> int:
+        return value.hour * 3600 + value.minute * 60 + value.second
+
+    @classmethod
+    def _compile(cls, intervals: List[Tuple[int, int, str]]) -> Tuple[List, List, List]:
+        starts, ends, labels = [], [], []
+        for start, end, label in sorted(intervals):
+            end = min(end, cls.DAY - 1)
+            if starts and start <= ends[-1]:
+                ends[-1] = max(ends[-1], end)
+                continue
+            starts.append(start)
+            ends.append(end)
+            labels.append(label)
+        return starts, ends, labels
+
+    @staticmethod
+    def _lookup(intervals: Tuple[List, List, List], offset: float) -> Optional[str]:
+        starts, ends, labels = intervals
+        i = bisect_right(starts, offset) - 1
+        if i >= 0 and offset <= ends[i]:
+            return labels[i]
+        return None
+
+    @staticmethod
+    def _offset(moment: datetime) -> float:
+        return (
+            moment.hour * 3600
+            + moment.minute * 60
+            + moment.second
+            + moment.microsecond / 1e6
+        )
+
+    def _active_intervals(self, day: datetime) -> Tuple[List, List, List]:
+        return self.weekend if day.weekday() >= 5 else self.weekday
+
+    def is_active(self, moment: datetime) -> bool:
+        return (
+            self._lookup(self._active_intervals(moment), self._offset(moment))
+            is not None
+        )
+
+    def break_at(self, moment: datetime) -> Optional[str]:
+        """Return the kind of break (``bathroom``/``lunch``) covering ``moment``."""
+        return self._lookup(self.breaks, self._offset(moment))
+
+    def in_break(self, moment: datetime) -> bool:
+        return self.break_at(moment) is not None
+
+    def next_transition(self, moment: datetime) -> datetime:
+        """Return the next instant at which the active or break state changes."""
+        offset = self._offset(moment)
+        midnight = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+        candidates = []
+        for intervals in (self._active_intervals(moment), self.breaks):
+            starts, ends, _ = intervals
+            i = bisect_right(starts, offset)
+            if i < len(starts):
+                candidates.append(starts[i])
+            if i > 0 and offset < ends[i - 1]:
+                candidates.append(ends[i - 1])
+        if candidates:
+            return midnight + timedelta(seconds=min(candidates))
+        return midnight + timedelta(days=1)
+
+    def active_seconds_left_today(self, moment: datetime) -> float:
+        """Active seconds between ``moment`` and the end of its day."""
+        offset = self._offset(moment)
+        starts, ends, _ = self._active_intervals(moment)
+        return sum(
+            end - max(start, offset) for start, end in zip(starts, ends) if end > offset
+        )
+
+    def seconds_until_active(self, moment: datetime) -> float:
+        """Seconds until the next active window opens, ``0`` if already active."""
+        if self.is_active(moment):
+            return 0.0
+        offset = self._offset(moment)
+        midnight = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+        for days in range(8):
+            day = midnight + timedelta(days=days)
+            starts, _, _ = self._active_intervals(day)
+            i = bisect_right(starts, offset) if days == 0 else 0
+            if i < len(starts):
+                opens = day + timedelta(seconds=starts[i])
+                return (opens - moment).total_seconds()
+        raise ConfigError("Schedule has no active hours")
+
+
+class StartupReport:
+    """Wall-clock duration of each phase of bringing a browser session up.
+
+    Phases add up until :meth:`reset`, which follows every cold start, so
+    each report covers the work done since the previous one: a config file
+    loaded at startup or reloaded in between shows up once, in the next.
+    """
+
+    PHASES = ['imports', 'config_load', 'driver_resolution', 'browser_launch', 'login']
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time_module.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time_module.perf_counter() - started
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed
+
+    def reset(self):
+        self.phases.clear()
+
+    def summary(self) -> str:
+        timings = [
+            f"{name}={self.phases[name] * 1000:.0f}ms"
+            for name in self.PHASES
+            if name in self.phases
+        ]
+        total = sum(self.phases.values())
+        return f"{', '.join(timings)} (total {total * 1000:.0f}ms)"
+
+
+@lru_cache(maxsize=None)
+def load_instapy():
+    """Import instapy on first use and apply our xpath override once."""
+    import instapy
+    from instapy.xpath_compile import xpath
+
+    xpath["login_user"] = {"login_elem_no_such_exception_2", "//div[text()='Log In']"}
+    return instapy
+
+
+# Firefox preferences written to the lean profile's user.js.
+LEAN_PREFERENCES = {
+    # No audio or video starts without a user gesture.
+    'media.autoplay.default': 5,
+    'media.autoplay.blocking_policy': 2,
+    'media.autoplay.block-webaudio': True,
+    'media.preload.default': 0,
+    # System fonts only.
+    'gfx.downloadable_fonts.enabled': False,
+    'browser.display.use_document_fonts': 0,
+    'dom.serviceWorkers.enabled': False,
+    'dom.push.enabled': False,
+    # Bounded in-memory cache instead of the disk cache.
+    'browser.cache.disk.enable': False,
+    'browser.cache.memory.enable': True,
+    'browser.cache.offline.enable': False,
+    'browser.sessionhistory.max_total_viewers': 0,
+    # No speculative connections or prefetching.
+    'network.prefetch-next': False,
+    'network.dns.disablePrefetch': True,
+    'network.http.speculative-parallel-limit': 0,
+    'privacy.trackingprotection.enabled': True,
+}
+
+# Requests to blocked hosts are sent to a closed local port by a PAC file.
+BLOCKHOST_PAC = """function FindProxyForURL(url, host) {
+  var blocked = %s;
+  for (var i = 0; i < blocked.length; i++) {
+    if (host == blocked[i] || dnsDomainIs(host, "." + blocked[i])) {
+      return "PROXY 127.0.0.1:9";
+    }
+  }
+  return "DIRECT";
+}
+"""
+
+
+def write_lean_profile(settings: BrowserSettings) -> str:
+    """Write a Firefox profile with ``user.js`` tuned for low page weight.
+
+    InstaPy copies the directory via ``browser_profile_path`` and Firefox
+    applies ``user.js`` on top of InstaPy's own preferences.
+    """
+    os.makedirs(settings.profile_dir, exist_ok=True)
+    preferences = dict(LEAN_PREFERENCES)
+    preferences['browser.cache.memory.capacity'] = settings.memory_cache_kb
+    if settings.blocked_hosts:
+        pac_path = os.path.abspath(os.path.join(settings.profile_dir, 'blocklist.pac'))
+        with open(pac_path, 'w', encoding='utf-8') as f:
+            f.write(BLOCKHOST_PAC % json.dumps(list(settings.blocked_hosts)))
+        preferences['network.proxy.type'] = 2
+        preferences['network.proxy.autoconfig_url'] = 'file://' + pac_path
+
+    with open(
+        os.path.join(settings.profile_dir, 'user.js'), 'w', encoding='utf-8'
+    ) as f:
+        for name, value in preferences.items():
+            f.write(f'user_pref({json.dumps(name)}, {json.dumps(value)});\n')
+    session_logger.info("Lean browser profile written to %s", settings.profile_dir)
+    return settings.profile_dir
+
+
+class PageStats:
+    """Page loads, load time and bytes transferred by one browser.
+
+    ``browser.get`` is wrapped so every navigation is timed; transfer sizes
+    come from the Performance API, whose resource buffer is drained on each
+    read so XHR traffic between navigations is counted too.
+    """
+
+    COLLECT_SCRIPT = """
+        const nav = performance.getEntriesByType('navigation')[0];
+        const resources = performance.getEntriesByType('resource');
+        performance.clearResourceTimings();
+        performance.setResourceTimingBufferSize(5000);
+        return [
+            nav ? nav.transferSize : 0,
+            resources.reduce((total, entry) => total + entry.transferSize, 0),
+        ];
+    """
+
+    def __init__(self, browser):
+        self.browser = browser
+        self.pages = 0
+        self.load_seconds = 0.0
+        self.bytes = 0
+        self.on_load: Optional[Callable[[float], None]] = None
+        self._get = browser.get
+        browser.get = self.get
+
+    def get(self, url: str):
+        started = time_module.perf_counter()
+        try:
+            return self._get(url)
+        finally:
+            elapsed = time_module.perf_counter() - started
+            self.pages += 1
+            self.load_seconds += elapsed
+            if self.on_load is not None:
+                self.on_load(elapsed)
+            self.collect(navigation=True)
+
+    def collect(self, navigation: bool = False):
+        try:
+            document, resources = self.browser.execute_script(self.COLLECT_SCRIPT)
+        except WebDriverException:
+            session_logger.debug("Could not read performance entries", exc_info=True)
+            return
+        self.bytes += resources + (document if navigation else 0)
+
+    def snapshot(self) -> Tuple[int, float, int]:
+        return self.pages, self.load_seconds, self.bytes
+
+
+class LatencyTracker:
+    """EWMA and recent-window percentiles of one kind of latency."""
+
+    def __init__(self, window: int = 200, smoothing: float = 0.2):
+        self.samples = deque(maxlen=window)
+        self.smoothing = smoothing
+        self.mean: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    def observe(self, seconds: float):
+        self.samples.append(seconds)
+        if self.mean is None:
+            self.mean = seconds
+        else:
+            self.mean += self.smoothing * (seconds - self.mean)
+
+    def percentile(self, q: float) -> float:
+        ordered = sorted(self.samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+class PageWaits:
+    """Sizes Selenium's waits from the latencies the browser actually shows.
+
+    ``find_element``/``find_elements`` are wrapped to time how long elements
+    take to appear, and :class:`PageStats` reports every page load. Once
+    ``min_samples`` are in, the implicit wait (InstaPy's ``page_delay``) is
+    set to the p95 element latency times ``margin`` and the page load
+    timeout to the p99 load time times ``margin``, each clamped to its
+    configured range. InstaPy retries a timed-out page load by itself; a
+    timeout that still reaches an action switches both back to their
+    maximum for ``fallback_seconds``.
+
+    Probing for an element that is absent always costs the full implicit
+    wait, so every such miss is where time is saved against ``max_wait``.
+    """
+
+    def __init__(self, settings: 'PageWaitSettings', clock: Clock, metrics: 'Metrics'):
+        self.settings = settings
+        self.clock = clock
+        self.metrics = metrics
+        self.loads = LatencyTracker(settings.window, settings.smoothing)
+        self.elements = LatencyTracker(settings.window, settings.smoothing)
+        self.implicit = settings.max_wait
+        self.page_load = settings.max_page_load
+        self.fallback_until = 0.0
+        self.session = None
+        self.saved = 0.0
+        self.misses = 0
+
+    def configure(self, settings: 'PageWaitSettings'):
+        self.settings = settings
+        self.apply()
+
+    def install(self, session: 'InstaPy'):
+        self.session = None
+        browser = getattr(session, 'browser', None)
+        if not self.settings.enabled or not hasattr(browser, 'implicitly_wait'):
+            return
+        for name in ('find_element', 'find_elements'):
+            setattr(browser, name, self._timed(getattr(browser, name)))
+        page_stats = getattr(session, 'page_stats', None)
+        if page_stats is not None:
+            page_stats.on_load = self.loads.observe
+        self.session = session
+        self.apply(force=True)
+
+    def _timed(self, find: Callable) -> Callable:
+        def timed_find(*args, **kwargs):
+            started = time_module.perf_counter()
+            try:
+                found = find(*args, **kwargs)
+            except NoSuchElementException:
+                self._miss(time_module.perf_counter() - started)
+                raise
+            if found:
+                self.elements.observe(time_module.perf_counter() - started)
+            else:
+                self._miss(time_module.perf_counter() - started)
+            return found
+
+        return timed_find
+
+    def _miss(self, elapsed: float):
+        saved = max(self.settings.max_wait - elapsed, 0.0)
+        self.misses += 1
+        self.saved += saved
+        self.metrics.inc('instabot_wait_saved_seconds_total', saved)
+
+    def targets(self) -> Tuple[float, float]:
+        """The implicit wait and page load timeout the latencies call for."""
+        s = self.settings
+        implicit, page_load = s.max_wait, s.max_page_load
+        if self.clock.monotonic() < self.fallback_until:
+            return implicit, page_load
+        if len(self.elements) >= s.min_samples:
+            estimate = self.elements.percentile(0.95) * s.margin
+            implicit = min(max(estimate, s.min_wait), s.max_wait)
+        if len(self.loads) >= s.min_samples:
+            estimate = self.loads.percentile(0.99) * s.margin
+            page_load = min(max(estimate, s.min_page_load), s.max_page_load)
+        return implicit, page_load
+
+    def apply(self, force: bool = False):
+        if self.session is None:
+            return
+        implicit, page_load = self.targets()
+        browser = self.session.browser
+        try:
+            if force or abs(implicit - self.implicit) >= 0.25:
+                browser.implicitly_wait(implicit)
+                # InstaPy restores the implicit wait from page_delay.
+                self.session.page_delay = implicit
+                self.implicit = implicit
+            if force or abs(page_load - self.page_load) >= 1:
+                browser.set_page_load_timeout(page_load)
+                self.page_load = page_load
+        except WebDriverException:
+            session_logger.debug("Could not update browser waits", exc_info=True)
+
+    def fallback(self):
+        if self.session is None:
+            return
+        self.fallback_until = self.clock.monotonic() + self.settings.fallback_seconds
+        session_logger.warning(
+            "Timeout during action, using maximum waits for %ss",
+            self.settings.fallback_seconds,
+        )
+        self.apply()
+
+    def session_summary(self) -> Tuple[float, int]:
+        """Seconds saved and element misses since the last call."""
+        summary = self.saved, self.misses
+        self.saved, self.misses = 0.0, 0
+        return summary
+
+    def absorb(self, implicit: float, page_load: float, saved: float, misses: int):
+        """Take in what the :class:`PageWaits` of a browser worker reports."""
+        self.implicit, self.page_load = implicit, page_load
+        self.saved += saved
+        self.misses += misses
+
+
+class InstaPyBackend:
+    """Creates real InstaPy sessions driving a headless Firefox.
+
+    The geckodriver path is resolved once per process, in order: the
+    configured ``browser.geckodriver_path`` (or ``GECKODRIVER_PATH``), the
+    path pinned in ``browser.driver_cache`` by an earlier run, a
+    ``geckodriver`` on ``PATH`` and finally webdriver_manager. With
+    ``browser.offline`` set the last step is skipped, so startup never
+    touches the network.
+    """
+
+    def __init__(self, settings: Optional[BrowserSettings] = None, startup=None):
+        settings = settings or BrowserSettings()
+        self.settings = settings
+        self.geckodriver_path = settings.geckodriver_path or os.environ.get(
+            'GECKODRIVER_PATH'
+        )
+        self.offline = settings.offline
+        self.driver_cache = settings.driver_cache
+        self.startup = startup or StartupReport()
+        self._driver_path: Optional[str] = None
+
+    def _pinned_driver(self) -> Optional[str]:
+        try:
+            with open(self.driver_cache, 'r', encoding='utf-8') as f:
+                path = f.read().strip()
+        except FileNotFoundError:
+            return None
+        return path if path and os.path.exists(path) else None
+
+    def _pin_driver(self, path: str):
+        try:
+            with open(self.driver_cache, 'w', encoding='utf-8') as f:
+                f.write(path)
+        except OSError as e:
+            session_logger.warning("Could not pin geckodriver path: %s", e)
+
+    def resolve_driver(self) -> str:
+        if self._driver_path:
+            return self._driver_path
+
+        path = (
+            self.geckodriver_path
+            or self._pinned_driver()
+            or shutil.which('geckodriver')
+        )
+        if not path:
+            if self.offline:
+                raise ConfigError(
+                    "No geckodriver found and browser.offline forbids downloading one"
+                )
+            from webdriver_manager.firefox import GeckoDriverManager
+
+            path = GeckoDriverManager().install()
+            self._pin_driver(path)
+
+        session_logger.info("Using geckodriver at %s", path)
+        self._driver_path = path
+        return path
+
+    def create_session(self, **kwargs) -> 'InstaPy':
+        with self.startup.phase('imports'):
+            instapy = load_instapy()
+        with self.startup.phase('driver_resolution'):
+            geckodriver_path = self.resolve_driver()
+        if self.settings.lean:
+            kwargs.setdefault('browser_profile_path', write_lean_profile(self.settings))
+        with self.startup.phase('browser_launch'):
+            session = instapy.InstaPy(geckodriver_path=geckodriver_path, **kwargs)
+        if self.settings.page_stats and session.browser is not None:
+            session.page_stats = PageStats(session.browser)
+        return session
+
+
+def remote_error(name: str, message: str) -> Exception:
+    """Rebuild an exception raised in a browser worker from its type name.
+
+    Selenium and builtin exceptions keep their type, so error
+    classification works as in-process; anything else becomes a
+    ``RuntimeError``.
+    """
+    cls = getattr(selenium_exceptions, name, None) or getattr(builtins, name, None)
+    if isinstance(cls, type) and issubclass(cls, Exception):
+        try:
+            return cls(message)
+        except TypeError:
+            pass
+    return RuntimeError(f"{name}: {message}")
+
+
+def worker_main(
+    conn,
+    factory: Callable,
+    args: Tuple,
+    logging_settings: LoggingSettings,
+    profile_cache: Optional['ProfileCacheSettings'] = None,
+    waits: Optional['PageWaitSettings'] = None,
+):
+    """Entry point of a browser worker process; see :class:`BrowserWorker`."""
+    # Lead a process group that geckodriver and Firefox inherit, so whatever
+    # outlives the worker can be killed without tracking pids.
+    os.setsid()
+    # The scheduler decides when to stop; SIGTERM quits the browser first.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    handler = logging.StreamHandler()
+    if logging_settings.format == 'json':
+        handler.setFormatter(JsonLinesFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(LOG_FORMAT, LOG_DATEFMT))
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(logging_settings.level)
+
+    backend = factory(*args)
+    session = None
+    cache: Optional[ProfileCache] = None
+    page_waits: Optional[PageWaits] = None
+    clock = Clock()
+    metrics = RelayMetrics()
+    events: List[Tuple[str, Tuple]] = []
+
+    def quit_browser():
+        if session is not None and session.browser is not None:
+            try:
+                session.browser.quit()
+            except Exception:
+                session_logger.debug("Browser was already gone", exc_info=True)
+
+    def shut_down(signum, frame):
+        quit_browser()
+        os._exit(0)
+
+    signal.signal(signal.SIGTERM, shut_down)
+
+    while True:
+        try:
+            op, target, args, kwargs = conn.recv()
+        except EOFError:
+            break
+        error = None
+        try:
+            if op == 'create':
+                session = backend.create_session(**kwargs)
+                event = sys.modules.get('instapy.event')
+                if event is not None:
+                    for name in ('followed', 'unfollowed'):
+                        event.Event().add_callback(
+                            name,
+                            lambda username, name=name: events.append(
+                                (name, (username,))
+                            ),
+                        )
+                # Hooks that patch the session in place run next to it.
+                if profile_cache is not None:
+                    cache = ProfileCache(profile_cache, clock, metrics)
+                    cache.install(session)
+                if waits is not None:
+                    page_waits = session.page_waits = PageWaits(waits, clock, metrics)
+                    page_waits.install(session)
+                value = None
+            elif op == 'call':
+                value = getattr(session, target)(*args, **kwargs)
+            elif op == 'get':
+                value = attrgetter(target)(session)
+            else:
+                value = target(session, *args, **kwargs)
+        except Exception as e:
+            error = e
+        page_stats = getattr(session, 'page_stats', None)
+        if op == 'call' and session is not None:
+            if page_stats is not None:
+                page_stats.collect()
+            if page_waits is not None:
+                if isinstance(error, TimeoutException):
+                    page_waits.fallback()
+                else:
+                    page_waits.apply()
+                summary = page_waits.session_summary()
+                events.append(
+                    ('waits', (page_waits.implicit, page_waits.page_load, *summary))
+                )
+            if cache is not None:
+                metrics.set('instabot_profile_cache_entries', cache.size)
+        events.extend(('metric', update) for update in metrics.drain())
+        state = {
+            'counters': {
+                name: getattr(session, name, 0) or 0 for name in RemoteSession.COUNTERS
+            },
+            'pages': page_stats.snapshot() if page_stats is not None else None,
+        }
+        if error is not None:
+            message = getattr(error, 'msg', None) or str(error)
+            reply = ('error', type(error).__name__, message, list(events), state)
+        else:
+            status = 'session' if value is session else 'ok'
+            value = None if value is session else value
+            reply = (status, value, list(events), state)
+        events.clear()
+        try:
+            conn.send(reply)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            conn.send(('ok', None) + reply[-2:])
+    quit_browser()
+    if cache is not None:
+        cache.close()
+
+
+class BrowserWorker:
+    """One browser worker process and the scheduler's end of its pipe.
+
+    The worker hosts a single session from ``factory(*args)`` and answers
+    ``(op, target, args, kwargs)`` requests in order: ``create`` launches
+    the browser, ``call`` and ``get`` reach a session method or (dotted)
+    attribute and ``run`` calls ``target(session, *args, **kwargs)``.
+    Replies are ``('ok', value, events, state)``, ``('session', None,
+    events, state)`` when a method returned the session itself, or
+    ``('error', type name, message, events, state)``. ``events`` are what
+    happened since the last reply: InstaPy follow events, ``metric`` updates
+    and ``waits`` summaries from the worker's hooks. ``state`` holds the
+    session's interaction counters and :class:`PageStats` totals after the
+    request, kept in :attr:`state` so reading them costs no round trip.
+
+    The worker installs the profile cache and adaptive waits on its own
+    session from the settings it is launched with; after every ``call`` it
+    applies the waits and collects page stats, as the bot does in process.
+    The browser is launched as soon as the process starts.
+    """
+
+    def __init__(
+        self,
+        context,
+        factory: Callable,
+        args: Tuple,
+        logging_settings: LoggingSettings,
+        kwargs: Dict,
+        hooks: Tuple = (),
+    ):
+        self.conn, child = context.Pipe()
+        self.process = context.Process(
+            target=worker_main,
+            args=(child, factory, args, logging_settings, *hooks),
+            name='browser-worker',
+            daemon=True,
+        )
+        self.process.start()
+        child.close()
+        self.listeners: Dict[str, List[Callable]] = {}
+        self.state: Dict = {'counters': {}, 'pages': None}
+        self.created = False
+        self.conn.send(('create', '', (), kwargs))
+        session_logger.info("Started browser worker %s", self.process.pid)
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self.process.pid
+
+    def _receive(self) -> Tuple[str, object]:
+        try:
+            status, *payload, events, self.state = self.conn.recv()
+        except (EOFError, OSError) as e:
+            raise WebDriverException("Browser worker exited") from e
+        for name, args in events:
+            for callback in self.listeners.get(name, ()):
+                callback(*args)
+        if status == 'error':
+            raise remote_error(*payload)
+        return status, payload[0]
+
+    def wait_created(self, timeout: float):
+        if self.created:
+            return
+        if not self.conn.poll(timeout):
+            raise WebDriverException(f"Browser worker did not start within {timeout}s")
+        self._receive()
+        self.created = True
+
+    def ready(self) -> bool:
+        """Whether the browser is up, without blocking on it."""
+        if not self.process.is_alive():
+            return False
+        if not self.created and self.conn.poll(0):
+            try:
+                self._receive()
+            except Exception:
+                session_logger.warning("Browser worker failed to start", exc_info=True)
+                self.stop()
+                return False
+            self.created = True
+        return self.created
+
+    def request(self, op: str, target='', args: Tuple = (), kwargs=None):
+        if not self.process.is_alive():
+            raise WebDriverException("Browser worker exited")
+        try:
+            self.conn.send((op, target, args, kwargs or {}))
+        except OSError as e:
+            raise WebDriverException("Browser worker exited") from e
+        return self._receive()
+
+    def stop(self, timeout: float = 10.0):
+        """Terminate the worker, then kill its process group.
+
+        The group (led by the worker, see :func:`worker_main`) still holds
+        any geckodriver or Firefox left behind, even once they are orphaned,
+        and is gone when they are. Only signals are used, never the pipe, so
+        this is safe while another thread is blocked on a request.
+        """
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout)
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except OSError:
+            pass
+        else:
+            session_logger.debug("Killed leftovers of browser worker %s", self.pid)
+        self.process.join(timeout)
+        self.conn.close()
+
+
+class RemoteBrowser:
+    """Driver of a :class:`RemoteSession`: just enough for liveness checks,
+    the memory watchdog and discarding a crashed session."""
+
+    def __init__(self, worker: BrowserWorker):
+        self.worker = worker
+        # MemoryWatchdog measures the tree under service.process.pid.
+        self.service = SimpleNamespace(process=worker.process)
+
+    @property
+    def current_url(self) -> str:
+        return self.worker.request('get', 'browser.current_url')[1]
+
+    def quit(self):
+        self.worker.stop()
+
+
+class RemotePageStats:
+    """The :class:`PageStats` of a worker's browser, as of its last reply."""
+
+    def __init__(self, worker: BrowserWorker):
+        self.worker = worker
+
+    def collect(self):
+        """Nothing to do: the worker collects after every call."""
+
+    def snapshot(self) -> Tuple[int, float, int]:
+        return tuple(self.worker.state['pages'])
+
+
+def configure_page_waits(session: 'InstaPy', settings: 'PageWaitSettings'):
+    """Hand edited wait settings to the :class:`PageWaits` of a worker."""
+    page_waits = getattr(session, 'page_waits', None)
+    if page_waits is not None:
+        page_waits.configure(settings)
+
+
+class RemoteSession:
+    """Scheduler-side proxy of the session living in a :class:`BrowserWorker`.
+
+    Only the methods and attributes the bot uses are forwarded; counters
+    and page stats are served from the worker's last reply, so spans around
+    an action never wait on (or fail with) a dead worker. Hooks that patch
+    the session or its driver in place live in the worker itself.
+    """
+
+    METHODS = frozenset(
+        {
+            'set_quota_supervisor',
+            'set_relationship_bounds',
+            'set_skip_users',
+            'set_user_interact',
+            'set_do_like',
+            'set_do_comment',
+            'login',
+            'like_by_feed',
+            'like_by_tags',
+            'like_by_locations',
+            'follow_user_followers',
+            'unfollow_users',
+        }
+    )
+    ATTRIBUTES = frozenset({'aborting', 'page_delay'})
+    COUNTERS = ('liked_img', 'commented', 'followed', 'unfollowed', 'inap_img')
+
+    def __init__(self, worker: BrowserWorker):
+        self.worker = worker
+        self.browser = RemoteBrowser(worker)
+
+    def __getattr__(self, name: str):
+        if name in self.METHODS:
+            return lambda *args, **kwargs: self._call(name, args, kwargs)
+        if name in self.ATTRIBUTES:
+            return self.worker.request('get', name)[1]
+        if name in self.COUNTERS:
+            return self.worker.state['counters'].get(name, 0)
+        raise AttributeError(name)
+
+    @property
+    def page_stats(self) -> Optional['RemotePageStats']:
+        if self.worker.state['pages'] is None:
+            return None
+        return RemotePageStats(self.worker)
+
+    def _call(self, name: str, args: Tuple, kwargs: Dict):
+        status, value = self.worker.request('call', name, args, kwargs)
+        return self if status == 'session' else value
+
+    def run(self, func: Callable, *args, **kwargs):
+        """Call module-level ``func(session, *args, **kwargs)`` in the worker."""
+        return self.worker.request('run', func, args, kwargs)[1]
+
+    def subscribe(self, name: str, callback: Callable):
+        self.worker.listeners.setdefault(name, []).append(callback)
+
+    def end(self, threaded_session: bool = False):
+        try:
+            self._call('end', (), {'threaded_session': threaded_session})
+        finally:
+            self.worker.stop()
+
+
+class WorkerBackend:
+    """Runs each session's browser in a supervised worker process.
+
+    A crash of Firefox, geckodriver or the worker itself reaches the
+    scheduler as a ``WebDriverException``, like an in-process crash. With
+    ``worker.standby`` a second worker launches its browser (but does not
+    log in) as soon as a session starts, and the next
+    :meth:`create_session` promotes it instead of starting cold.
+    """
+
+    def __init__(
+        self,
+        settings: WorkerSettings,
+        factory: Callable = InstaPyBackend,
+        args: Tuple = (),
+        logging_settings: Optional[LoggingSettings] = None,
+        startup=None,
+        profile_cache: Optional['ProfileCacheSettings'] = None,
+        waits: Optional['PageWaitSettings'] = None,
+    ):
+        self.settings = settings
+        self.factory = factory
+        self.args = args
+        self.logging_settings = logging_settings or LoggingSettings()
+        self.hooks = (profile_cache, waits)
+        self.startup = startup or StartupReport()
+        self.context = multiprocessing.get_context('spawn')
+        self.active: Optional[BrowserWorker] = None
+        self.standby: Optional[BrowserWorker] = None
+        self.launches = 0
+        self.takeovers = 0
+
+    def _launch(self, kwargs: Dict) -> BrowserWorker:
+        self.launches += 1
+        return BrowserWorker(
+            self.context,
+            self.factory,
+            self.args,
+            self.logging_settings,
+            kwargs,
+            self.hooks,
+        )
+
+    def standby_ready(self) -> bool:
+        return self.standby is not None and self.standby.ready()
+
+    def create_session(self, **kwargs) -> RemoteSession:
+        worker, self.standby = self.standby, None
+        if worker is not None and worker.process.is_alive():
+            self.takeovers += 1
+            session_logger.info("Standby browser worker %s takes over", worker.pid)
+        else:
+            if worker is not None:
+                worker.stop()
+            worker = self._launch(kwargs)
+        try:
+            with self.startup.phase('browser_launch'):
+                worker.wait_created(self.settings.start_timeout)
+        except Exception:
+            worker.stop()
+            raise
+        self.active = worker
+        if self.settings.standby:
+            self.standby = self._launch(kwargs)
+        return RemoteSession(worker)
+
+    def stats(self) -> Dict:
+        return {
+            'launches': self.launches,
+            'takeovers': self.takeovers,
+            'standby_ready': int(self.standby_ready()),
+        }
+
+    def close(self):
+        for worker in (self.standby, self.active):
+            if worker is not None:
+                worker.stop()
+        self.standby = self.active = None
+
+
+class SessionManager:
+    """Keeps one logged-in session alive across iterations of the run loop.
+
+    A browser is only launched (a "cold start") when there is no session or
+    the current one has died; otherwise the session is reused and only the
+    quota and relationship settings that changed since the last
+    :meth:`acquire` are re-applied.
+    """
+
+    def __init__(self, bot: 'InstagramBot', max_idle: int = 2 * 3600):
+        self.bot = bot
+        self.max_idle = max_idle
+        self.session = None
+        self.applied: Dict = {}
+        self.cold_starts = 0
+        self.reuses = 0
+        self.relogins = 0
+        self.recycles = 0
+        self.recycled = False
+
+    @staticmethod
+    def is_alive(session: 'InstaPy') -> bool:
+        try:
+            if session.aborting or session.browser is None:
+                return False
+            session.browser.current_url
+        except WebDriverException:
+            return False
+        return True
+
+    def acquire(self, settings: Dict) -> 'InstaPy':
+        self.recycled = False
+        if self.session is not None:
+            if self.is_alive(self.session):
+                self.reuses += 1
+                self._reconfigure(settings)
+                session_logger.info("Reusing warm session (%s)", self.stats())
+                return self.session
+            session_logger.warning("Session died, logging in again")
+            self.relogins += 1
+            self.discard()
+
+        started = self.bot.clock.monotonic()
+        session = self.bot.init_session(settings)
+        with self.bot.startup.phase('login'):
+            session.login()
+        if self.bot.decision_log is not None:
+            self.bot.decision_log.write(
+                {'login': round(self.bot.clock.monotonic() - started, 3)}
+            )
+        if session.aborting:
+            self.session = session
+            self.discard()
+            raise RuntimeError("Login failed")
+
+        self.cold_starts += 1
+        self.session = session
+        self.applied = {
+            'limits': settings['limits'],
+            'bounds': self.bot.config.relationship_bounds,
+        }
+        session_logger.info("Started new session (%s)", self.stats())
+        session_logger.info("Startup timing: %s", self.bot.startup.summary())
+        self.bot.startup.reset()
+        return session
+
+    def _reconfigure(self, settings: Dict):
+        if settings['limits'] != self.applied.get('limits'):
+            session_logger.info("Quota changed, re-applying: %s", settings['limits'])
+            self.bot.apply_quota_supervisor(self.session, settings['limits'])
+            self.applied['limits'] = settings['limits']
+
+        bounds = self.bot.config.relationship_bounds
+        if bounds != self.applied.get('bounds'):
+            session_logger.info("Relationship bounds changed, re-applying: %s", bounds)
+            self.bot.apply_relationship_bounds(self.session, bounds)
+            self.applied['bounds'] = bounds
+
+    def discard(self):
+        """Drop the current session without the orderly InstaPy shutdown."""
+        if self.session is not None and self.session.browser:
+            try:
+                self.session.browser.quit()
+            except WebDriverException:
+                session_logger.debug("Browser was already gone", exc_info=True)
+        self.session = None
+        self.applied = {}
+
+    def close(self):
+        """End the current session cleanly, if there is one."""
+        if self.session is None:
+            return
+        session_logger.info("Closing browser session")
+        try:
+            self.session.end()
+        except WebDriverException:
+            session_logger.warning("Browser session ended with an error", exc_info=True)
+        self.session = None
+        self.applied = {}
+
+    def recycle(self, reason: str):
+        """Close a healthy session on purpose; the next acquire starts fresh."""
+        session_logger.warning("Recycling browser session: %s", reason)
+        self.close()
+        self.recycles += 1
+        self.recycled = True
+
+    def stats(self) -> Dict:
+        return {
+            'cold_starts': self.cold_starts,
+            'reuses': self.reuses,
+            'relogins': self.relogins,
+            'recycles': self.recycles,
+        }
+
+
+def process_tree(root: int) -> List[int]:
+    """``root`` and all of its descendants, read from ``/proc``."""
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'rb') as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The command name may contain spaces; fields resume after its ')'.
+        ppid = int(stat.rsplit(b')', 1)[1].split()[1])
+        children.setdefault(ppid, []).append(int(entry))
+
+    tree, stack = [], [root]
+    while stack:
+        pid = stack.pop()
+        tree.append(pid)
+        stack.extend(children.get(pid, ()))
+    return tree
+
+
+def rss_bytes(pids: Sequence[int]) -> int:
+    """Summed resident set size of ``pids``; vanished processes count as 0."""
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    total = 0
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/statm', 'rb') as f:
+                total += int(f.read().split()[1]) * page_size
+        except (OSError, IndexError, ValueError):
+            continue
+    return total
+
+
+class MemoryWatchdog:
+    """Samples the RSS of the browser's process tree between actions.
+
+    The tree is rooted at geckodriver, whose children are the Firefox
+    parent and content processes. Every sample is appended to an in-memory
+    timeline and, when ``memory.timeline_file`` is set, to a JSON lines
+    file for sizing container limits.
+    """
+
+    def __init__(self, settings: MemorySettings, clock: Clock):
+        self.settings = settings
+        self.clock = clock
+        self.timeline: deque = deque(maxlen=settings.timeline_size)
+        self.available = os.path.isdir('/proc')
+        if settings.enabled and not self.available:
+            session_logger.warning("No /proc filesystem, memory watchdog disabled")
+
+    @staticmethod
+    def browser_pid(session) -> Optional[int]:
+        service = getattr(getattr(session, 'browser', None), 'service', None)
+        process = getattr(service, 'process', None)
+        return getattr(process, 'pid', None)
+
+    def sample(self, session, label: str = '') -> Optional[int]:
+        if not (self.settings.enabled and self.available) or session is None:
+            return None
+        pid = self.browser_pid(session)
+        if pid is None:
+            return None
+        pids = process_tree(pid)
+        rss = rss_bytes(pids)
+        entry = {
+            'ts': self.clock.now().isoformat(timespec='seconds'),
+            'rss': rss,
+            'processes': len(pids),
+            'after': label,
+        }
+        self.timeline.append(entry)
+        if self.settings.timeline_file:
+            try:
+                with open(self.settings.timeline_file, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(entry) + '\n')
+            except OSError as e:
+                session_logger.warning("Could not write memory timeline: %s", e)
+        session_logger.debug(
+            "Browser RSS %.0f MiB over %s processes", rss / 2**20, len(pids)
+        )
+        return rss
+
+    def peak(self) -> int:
+        return max((entry['rss'] for entry in self.timeline), default=0)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense."""
+
+    BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimate the ``q`` quantile the way Prometheus' histogram_quantile does."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        lower, below = 0.0, 0
+        for bound, cumulative in zip(self.buckets, self.counts):
+            if cumulative >= rank:
+                inside = cumulative - below
+                return lower + (bound - lower) * (
+                    (rank - below) / inside if inside else 1
+                )
+            lower, below = bound, cumulative
+        return self.buckets[-1]
+
+
+class Metrics:
+    """Thread-safe registry of counters, gauges and histograms.
+
+    Series are keyed by metric name and a sorted tuple of label pairs and
+    rendered in the Prometheus text exposition format by :meth:`render`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._types: Dict[str, str] = {}
+        self._help: Dict[str, str] = {}
+        self._values: Dict[str, Dict[Tuple, float]] = {}
+        self._histograms: Dict[str, Dict[Tuple, Histogram]] = {}
+
+    def describe(self, name: str, kind: str, help_text: str):
+        self._types[name] = kind
+        self._help[name] = help_text
+
+    @staticmethod
+    def _key(labels: Dict) -> Tuple:
+        return tuple(sorted(labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        with self._lock:
+            series = self._values.setdefault(name, {})
+            key = self._key(labels)
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        with self._lock:
+            self._values.setdefault(name, {})[self._key(labels)] = value
+
+    def observe(self, name: str, value: float, **labels):
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            key = self._key(labels)
+            if key not in series:
+                series[key] = Histogram()
+            series[key].observe(value)
+
+    @staticmethod
+    def _labels(key: Tuple, extra: Tuple = ()) -> str:
+        pairs = key + extra
+        if not pairs:
+            return ''
+        body = ','.join(
+            '{}="{}"'.format(k, str(v).replace('\\', r'\\').replace('"', r'\"'))
+            for k, v in pairs
+        )
+        return '{' + body + '}'
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name in sorted(set(self._values) | set(self._histograms)):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} {self._types.get(name, 'untyped')}")
+                for key, value in sorted(self._values.get(name, {}).items()):
+                    lines.append(f"{name}{self._labels(key)} {value:g}")
+                for key, hist in sorted(self._histograms.get(name, {}).items()):
+                    for bound, count in zip(hist.buckets, hist.counts):
+                        le = self._labels(key, (('le', f"{bound:g}"),))
+                        lines.append(f"{name}_bucket{le} {count}")
+                    inf = self._labels(key, (('le', '+Inf'),))
+                    lines.append(f"{name}_bucket{inf} {hist.count}")
+                    lines.append(f"{name}_sum{self._labels(key)} {hist.sum:g}")
+                    lines.append(f"{name}_count{self._labels(key)} {hist.count}")
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path: str):
+        """Atomically replace ``path`` with the current exposition."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+
+class RelayMetrics(Metrics):
+    """Metrics of a browser worker's hooks, relayed to the scheduler.
+
+    Updates are queued instead of stored; the worker sends them with its
+    next reply and the bot applies them to its own :class:`Metrics`.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.updates: List[Tuple[str, str, float, Dict]] = []
+
+    def inc(self, name: str, value: float = 1, **labels):
+        self.updates.append(('inc', name, value, labels))
+
+    def set(self, name: str, value: float, **labels):
+        self.updates.append(('set', name, value, labels))
+
+    def drain(self) -> List[Tuple[str, str, float, Dict]]:
+        updates, self.updates = self.updates, []
+        return updates
+
+
+class MetricsServer:
+    """Serves ``/metrics`` from a daemon thread."""
+
+    def __init__(self, metrics: Metrics, host: str = '127.0.0.1', port: int = 8000):
+        metrics_ref = metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics_ref.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                metrics_logger.debug(format, *args)
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(
+            target=self.httpd.serve_forever, name='metrics-server', daemon=True
+        )
+
+    def start(self):
+        self.thread.start()
+        host, port = self.httpd.server_address[:2]
+        metrics_logger.info("Serving metrics on http://%s:%s/metrics", host, port)
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+INTERACTION_COUNTERS = ('liked_img', 'commented', 'followed', 'unfollowed')
+
+
+def interaction_count(session) -> int:
+    """Total interactions an InstaPy session has performed so far."""
+    if session is None:
+        return 0
+    return sum(getattr(session, name, 0) or 0 for name in INTERACTION_COUNTERS)
+
+
+def follows_viewer(session: 'InstaPy', username: str) -> Optional[bool]:
+    """Whether ``username`` follows us, read from their profile page."""
+    from instapy.util import getUserData, web_address_navigator
+
+    try:
+        web_address_navigator(session.browser, f"https://www.instagram.com/{username}/")
+        return bool(getUserData('graphql.user.follows_viewer', session.browser))
+    except (WebDriverException, KeyError, TypeError, AttributeError):
+        logger.debug("Could not read follow status of %s", username, exc_info=True)
+        return None
+
+
+class ActionSpan:
+    """Start, end, interactions and page traffic of one action.
+
+    Time is measured on the bot's clock; page loads, load time and bytes
+    come from the session's :class:`PageStats` when it has one.
+    """
+
+    def __init__(self, clock: Clock, session=None):
+        self.clock = clock
+        self.session = session
+        self.started = clock.monotonic()
+        self.ended: Optional[float] = None
+        self.baseline = interaction_count(session)
+        self.interactions = 0
+        self.error: Optional[BaseException] = None
+        self.page_stats: Optional[PageStats] = getattr(session, 'page_stats', None)
+        self.page_baseline = self.page_stats.snapshot() if self.page_stats else None
+        self.pages = 0
+        self.load_seconds = 0.0
+        self.bytes = 0
+
+    def finish(self):
+        if self.ended is None:
+            self.ended = self.clock.monotonic()
+            self.interactions = interaction_count(self.session) - self.baseline
+            if self.page_stats is not None:
+                self.page_stats.collect()
+                pages, load_seconds, transferred = self.page_stats.snapshot()
+                self.pages = pages - self.page_baseline[0]
+                self.load_seconds = load_seconds - self.page_baseline[1]
+                self.bytes = transferred - self.page_baseline[2]
+
+    @property
+    def duration(self) -> float:
+        return (self.ended or self.clock.monotonic()) - self.started
+
+
+class ActionLedger:
+    """Durable record of every action the bot ran, stored in SQLite.
+
+    Rows are buffered and committed in batches of ``batch_size`` or every
+    ``flush_interval`` seconds, whichever comes first; the database runs in
+    WAL mode so readers never block the writer. Counting queries include
+    rows that are still buffered.
+
+    The ``follows`` table tracks every account the bot followed, indexed by
+    follow time, so unfollow candidates come from a query instead of a walk
+    through the following list in the browser. Follow events are rare and
+    committed immediately.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS actions (
+            id INTEGER PRIMARY KEY,
+            ts REAL NOT NULL,
+            action TEXT NOT NULL,
+            outcome TEXT NOT NULL,
+            interactions INTEGER NOT NULL,
+            duration REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS actions_ts ON actions (ts, interactions);
+        CREATE TABLE IF NOT EXISTS follows (
+            username TEXT PRIMARY KEY,
+            followed REAL NOT NULL,
+            followed_back INTEGER,
+            unfollowed REAL,
+            attempts INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS follows_active
+            ON follows (followed) WHERE unfollowed IS NULL;
+    """
+
+    # Unfollow tries after which an account that never unfollows is skipped.
+    MAX_UNFOLLOW_ATTEMPTS = 3
+
+    def __init__(
+        self, path: str = 'instabot.db', batch_size: int = 20, flush_interval=60.0
+    ):
+        if path != ':memory:' and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._pending: List[Tuple] = []
+        self._last_flush = time_module.monotonic()
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+        ledger_logger.info("Action ledger opened at %s", path)
+
+    def record(
+        self,
+        moment: datetime,
+        action: str,
+        outcome: str,
+        interactions: int,
+        duration: float,
+    ):
+        with self._lock:
+            self._pending.append(
+                (moment.timestamp(), action, outcome, interactions, duration)
+            )
+            due = time_module.monotonic() - self._last_flush >= self.flush_interval
+            if len(self._pending) >= self.batch_size or due:
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        self._last_flush = time_module.monotonic()
+        if not self._pending:
+            return
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO actions (ts, action, outcome, interactions, duration)"
+                " VALUES (?, ?, ?, ?, ?)",
+                self._pending,
+            )
+        ledger_logger.debug("Committed %s ledger rows", len(self._pending))
+        self._pending = []
+
+    def interactions_between(self, start: datetime, end: datetime) -> int:
+        low, high = start.timestamp(), end.timestamp()
+        with self._lock:
+            (stored,) = self.conn.execute(
+                "SELECT COALESCE(SUM(interactions), 0) FROM actions"
+                " WHERE ts >= ? AND ts < ?",
+                (low, high),
+            ).fetchone()
+            buffered = sum(row[3] for row in self._pending if low <= row[0] < high)
+        return stored + buffered
+
+    def seconds_per_interaction(self, now: datetime, days: int = 7) -> Dict[str, float]:
+        """Mean successful action duration per interaction, by action."""
+        self.flush()
+        since = (now - timedelta(days=days)).timestamp()
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT action, SUM(duration), SUM(interactions) FROM actions"
+                " WHERE ts >= ? AND outcome = 'success' AND interactions > 0"
+                " GROUP BY action",
+                (since,),
+            ).fetchall()
+        return {action: duration / count for action, duration, count in rows}
+
+    def interactions_today(self, now: datetime) -> int:
+        midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        return self.interactions_between(midnight, midnight + timedelta(days=1))
+
+    def interactions_this_hour(self, now: datetime) -> int:
+        hour = now.replace(minute=0, second=0, microsecond=0)
+        return self.interactions_between(hour, hour + timedelta(hours=1))
+
+    def record_follow(self, moment: datetime, username: str):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO follows (username, followed) VALUES (?, ?)"
+                " ON CONFLICT (username) DO UPDATE SET followed = excluded.followed,"
+                " followed_back = NULL, unfollowed = NULL, attempts = 0",
+                (username, moment.timestamp()),
+            )
+
+    def record_unfollow(self, moment: datetime, username: str):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE follows SET unfollowed = ? WHERE username = ?",
+                (moment.timestamp(), username),
+            )
+
+    def mark_followed_back(self, username: str, followed_back: bool):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE follows SET followed_back = ? WHERE username = ?",
+                (followed_back, username),
+            )
+
+    def unfollow_attempted(self, usernames: Sequence[str]):
+        """Count a try for every account in ``usernames`` still followed."""
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "UPDATE follows SET attempts = attempts + 1"
+                " WHERE username = ? AND unfollowed IS NULL",
+                [(username,) for username in usernames],
+            )
+
+    def unfollow_candidates(
+        self, followed_before: datetime, limit: int, non_followers: bool = False
+    ) -> List[str]:
+        """Oldest follows made before ``followed_before`` that are still active.
+
+        With ``non_followers``, accounts known to follow back are left out;
+        accounts whose status is unknown are included.
+        """
+        query = (
+            "SELECT username FROM follows WHERE unfollowed IS NULL"
+            " AND followed < ? AND attempts < ?"
+        )
+        if non_followers:
+            query += " AND followed_back IS NOT 1"
+        query += " ORDER BY followed LIMIT ?"
+        with self._lock:
+            rows = self.conn.execute(
+                query,
+                (followed_before.timestamp(), self.MAX_UNFOLLOW_ATTEMPTS, limit),
+            ).fetchall()
+        return [username for (username,) in rows]
+
+    def follow_counts(self) -> Dict[str, int]:
+        with self._lock:
+            active, followed_back, unfollowed = self.conn.execute(
+                "SELECT COALESCE(SUM(unfollowed IS NULL), 0),"
+                " COALESCE(SUM(unfollowed IS NULL AND followed_back IS 1), 0),"
+                " COALESCE(SUM(unfollowed IS NOT NULL), 0) FROM follows"
+            ).fetchone()
+        return {
+            'active': active,
+            'followed_back': followed_back,
+            'unfollowed': unfollowed,
+        }
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            self.conn.close()
+
+
+@dataclass(frozen=True, slots=True)
+class ProfileStats:
+    followers: Optional[int]
+    following: Optional[int]
+    posts: Optional[int]
+    private: bool
+    business: bool
+    default_pic: bool
+
+
+# getUserData queries InstaPy itself uses for each profile field.
+PROFILE_QUERIES = {
+    'followers': 'graphql.user.edge_followed_by.count',
+    'following': 'graphql.user.edge_follow.count',
+    'posts': 'graphql.user.edge_owner_to_timeline_media.count',
+    'private': 'graphql.user.is_private',
+    'business': 'graphql.user.is_business_account',
+    'default_pic': 'graphql.user.profile_pic_url',
+}
+DEFAULT_PROFILE_PIC = '11906329_960233084022564_1448528159_a.jpg'
+
+
+class ProfileCache:
+    """Persistent profile-stats cache with a TTL and LRU eviction.
+
+    :meth:`install` wraps a session's ``validate_user_call``: a fresh cache
+    entry that already fails the relationship bounds (or a skip rule that
+    applies every time) rejects the user without loading the profile.
+    Otherwise InstaPy validates as usual and the stats are read back from
+    the profile page it just loaded.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS profiles (
+            username TEXT PRIMARY KEY,
+            fetched REAL NOT NULL,
+            used REAL NOT NULL,
+            followers INTEGER,
+            following INTEGER,
+            posts INTEGER,
+            private INTEGER NOT NULL,
+            business INTEGER NOT NULL,
+            default_pic INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS profiles_used ON profiles (used);
+    """
+
+    def __init__(
+        self, settings: 'ProfileCacheSettings', clock: Clock, metrics: 'Metrics'
+    ):
+        path = settings.path
+        if path != ':memory:' and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.settings = settings
+        self.clock = clock
+        self.metrics = metrics
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+        self.size = self.conn.execute("SELECT COUNT(*) FROM profiles").fetchone()[0]
+        session_logger.info("Profile cache opened at %s (%s entries)", path, self.size)
+
+    def get(self, username: str) -> Optional[ProfileStats]:
+        now = self.clock.now().timestamp()
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT fetched, followers, following, posts, private, business, "
+                "default_pic FROM profiles WHERE username = ?",
+                (username,),
+            ).fetchone()
+            if row is not None and now - row[0] > self.settings.ttl:
+                self.conn.execute(
+                    "DELETE FROM profiles WHERE username = ?", (username,)
+                )
+                self.conn.commit()
+                self.size -= 1
+                row = None
+            if row is None:
+                self.metrics.inc('instabot_profile_cache_total', result='miss')
+                return None
+            self.conn.execute(
+                "UPDATE profiles SET used = ? WHERE username = ?", (now, username)
+            )
+            # Left open, the write transaction would block the other
+            # connection (a standby worker's) until the next put.
+            self.conn.commit()
+        self.metrics.inc('instabot_profile_cache_total', result='hit')
+        followers, following, posts, private, business, default_pic = row[1:]
+        return ProfileStats(
+            followers,
+            following,
+            posts,
+            bool(private),
+            bool(business),
+            bool(default_pic),
+        )
+
+    def put(self, username: str, stats: ProfileStats):
+        now = self.clock.now().timestamp()
+        with self._lock:
+            cursor = self.conn.execute(
+                "INSERT OR IGNORE INTO profiles VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    username,
+                    now,
+                    now,
+                    stats.followers,
+                    stats.following,
+                    stats.posts,
+                    stats.private,
+                    stats.business,
+                    stats.default_pic,
+                ),
+            )
+            if cursor.rowcount:
+                self.size += 1
+            else:
+                self.conn.execute(
+                    "UPDATE profiles SET fetched = ?, used = ?, followers = ?, "
+                    "following = ?, posts = ?, private = ?, business = ?, "
+                    "default_pic = ? WHERE username = ?",
+                    (
+                        now,
+                        now,
+                        stats.followers,
+                        stats.following,
+                        stats.posts,
+                        stats.private,
+                        stats.business,
+                        stats.default_pic,
+                        username,
+                    ),
+                )
+            excess = self.size - self.settings.max_entries
+            if excess > 0:
+                self.conn.execute(
+                    "DELETE FROM profiles WHERE username IN "
+                    "(SELECT username FROM profiles ORDER BY used LIMIT ?)",
+                    (excess,),
+                )
+                self.size -= excess
+            self.conn.commit()
+
+    @staticmethod
+    def rejection(session: 'InstaPy', stats: ProfileStats) -> Optional[str]:
+        """Why ``session`` would reject a user with ``stats`` on every try."""
+        bounds = [
+            (
+                'followers',
+                stats.followers,
+                session.min_followers,
+                session.max_followers,
+            ),
+            (
+                'following',
+                stats.following,
+                session.min_following,
+                session.max_following,
+            ),
+            ('posts', stats.posts, session.min_posts, session.max_posts),
+        ]
+        for name, value, low, high in bounds:
+            if value is None or (name != 'posts' and not session.delimit_by_numbers):
+                continue
+            if high and value > high:
+                return f"{name} {value} above {high}"
+            if low and value < low:
+                return f"{name} {value} below {low}"
+        if (
+            stats.private
+            and session.skip_private
+            and session.skip_private_percentage >= 100
+        ):
+            return "private account"
+        if (
+            stats.default_pic
+            and session.skip_no_profile_pic
+            and session.skip_no_profile_pic_percentage >= 100
+        ):
+            return "default profile picture"
+        if (
+            stats.business
+            and session.skip_business
+            and session.skip_business_percentage >= 100
+            and not session.skip_business_categories
+            and not session.dont_skip_business_categories
+        ):
+            return "business account"
+        return None
+
+    @staticmethod
+    def read_profile(session: 'InstaPy', username: str) -> Optional[ProfileStats]:
+        """Read the stats of ``username`` if its profile is the current page."""
+        from instapy.util import getUserData
+
+        browser = session.browser
+        try:
+            if f"instagram.com/{username}/" not in browser.current_url:
+                return None
+            values = {
+                name: getUserData(query, browser)
+                for name, query in PROFILE_QUERIES.items()
+            }
+        except (WebDriverException, KeyError, TypeError, AttributeError):
+            session_logger.debug(
+                "Could not read profile of %s", username, exc_info=True
+            )
+            return None
+        return ProfileStats(
+            followers=values['followers'],
+            following=values['following'],
+            posts=values['posts'],
+            private=bool(values['private']),
+            business=bool(values['business']),
+            default_pic=DEFAULT_PROFILE_PIC in str(values['default_pic']),
+        )
+
+    def install(self, session: 'InstaPy'):
+        validate = getattr(session, 'validate_user_call', None)
+        if validate is None:
+            return
+
+        def validate_user_call(user_name: str):
+            if '/' in user_name:
+                return validate(user_name)
+            stats = self.get(user_name)
+            if stats is not None:
+                reason = self.rejection(session, stats)
+                if reason is not None:
+                    self.metrics.inc('instabot_profile_cache_pages_saved_total')
+                    return False, f"--> '{user_name}' skipped from cache: {reason}\n"
+            result = validate(user_name)
+            stats = self.read_profile(session, user_name)
+            if stats is not None:
+                self.put(user_name, stats)
+            return result
+
+        session.validate_user_call = validate_user_call
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+class AliasTable:
+    """Walker's alias method: O(n) to build, O(1) per weighted draw."""
+
+    __slots__ = ('prob', 'alias')
+
+    def __init__(self, weights: Sequence[float]):
+        n = len(weights)
+        total = sum(weights)
+        scaled = [weight * n / total for weight in weights]
+        self.prob = [1.0] * n
+        self.alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.prob[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            (small if scaled[more] < 1.0 else large).append(more)
+
+    def draw(self, rng) -> int:
+        i = int(rng.random() * len(self.prob))
+        return i if rng.random() < self.prob[i] else self.alias[i]
+
+
+@dataclass(slots=True)
+class TargetStats:
+    actions: int = 0
+    interactions: float = 0.0
+    seconds: float = 0.0
+    recent_interactions: float = 0.0
+    recent_seconds: float = 0.0
+
+
+class TargetIndex:
+    """Weighted target pools with per-target yield and a cooldown set.
+
+    Targets drawn by :meth:`sample` and handed to an action by :meth:`claim`
+    stay pending until that action is recorded; its interactions and
+    duration are then split evenly between them. A target whose smoothed
+    yield drops below ``min_yield`` interactions per action, or rises above
+    ``max_seconds_per_interaction``, is skipped for ``duration`` seconds and
+    starts afresh afterwards.
+    """
+
+    SMOOTHING = 0.3
+
+    def __init__(self, targets: Targets, settings: TargetCooldown, clock: Clock):
+        self.settings = settings
+        self.clock = clock
+        self.stats: Dict[Tuple[str, str], TargetStats] = {}
+        self.cooldown: Dict[Tuple[str, str], float] = {}
+        self.pending: List[Tuple[str, str]] = []
+        self.rebuild(targets)
+
+    def rebuild(self, targets: Targets):
+        self.names = {kind: getattr(targets, kind) for kind in Targets.KINDS}
+        self.tables = {
+            kind: AliasTable(targets.weights_for(kind))
+            for kind, names in self.names.items()
+            if names
+        }
+
+    def cooling(self, key: Tuple[str, str]) -> bool:
+        until = self.cooldown.get(key)
+        if until is None:
+            return False
+        if self.clock.monotonic() >= until:
+            del self.cooldown[key]
+            targets_logger.info("%s %s is back from cooldown", *key)
+            return False
+        return True
+
+    def sample(self, kind: str, count: int, rng) -> List[str]:
+        names = self.names[kind]
+        if not names:
+            return []
+        table = self.tables[kind]
+        count = min(count, len(names))
+        chosen, seen = [], set()
+        for _ in range(count * 8):
+            if len(chosen) == count:
+                break
+            i = table.draw(rng)
+            if i not in seen:
+                seen.add(i)
+                if not self.cooling((kind, names[i])):
+                    chosen.append(names[i])
+        if len(chosen) < count:
+            # Most of the pool is cooling down: fall back to a scan.
+            for i, name in enumerate(names):
+                if len(chosen) == count:
+                    break
+                if i not in seen and not self.cooling((kind, name)):
+                    chosen.append(name)
+        return chosen
+
+    def claim(self, kind: str, names: Sequence[str]) -> List[str]:
+        """Mark targets sampled ahead of time as used by the running action.
+
+        Any that went into cooldown since they were sampled are dropped.
+        """
+        claimed = [name for name in names if not self.cooling((kind, name))]
+        self.pending.extend((kind, name) for name in claimed)
+        return claimed
+
+    def discard_pending(self):
+        self.pending = []
+
+    def record(self, interactions: int, duration: float):
+        pending, self.pending = self.pending, []
+        if not pending:
+            return
+        interactions /= len(pending)
+        duration /= len(pending)
+        for key in pending:
+            stats = self.stats.get(key)
+            if stats is None:
+                stats = self.stats[key] = TargetStats(
+                    recent_interactions=interactions, recent_seconds=duration
+                )
+            stats.actions += 1
+            stats.interactions += interactions
+            stats.seconds += duration
+            stats.recent_interactions += self.SMOOTHING * (
+                interactions - stats.recent_interactions
+            )
+            stats.recent_seconds += self.SMOOTHING * (duration - stats.recent_seconds)
+            self._check(key, stats)
+
+    def _check(self, key: Tuple[str, str], stats: TargetStats):
+        settings = self.settings
+        if stats.actions < settings.min_samples:
+            return
+        per_action = stats.recent_interactions
+        per_interaction = (
+            stats.recent_seconds / per_action if per_action else float('inf')
+        )
+        if (
+            per_action >= settings.min_yield
+            and per_interaction <= settings.max_seconds_per_interaction
+        ):
+            return
+        self.cooldown[key] = self.clock.monotonic() + settings.duration
+        del self.stats[key]
+        targets_logger.warning(
+            "Cooling down %s %s for %.1f hours (%.2f interactions/action, "
+            "%.0fs/interaction)",
+            *key,
+            settings.duration / 3600,
+            per_action,
+            per_interaction,
+        )
+
+    def counts(self) -> Dict[str, Tuple[int, int]]:
+        """Available and cooling targets per kind."""
+        cooling = {kind: 0 for kind in Targets.KINDS}
+        for kind, _ in list(self.cooldown):
+            cooling[kind] += 1
+        return {
+            kind: (len(names) - cooling[kind], cooling[kind])
+            for kind, names in self.names.items()
+        }
+
+
+TRANSIENT = 'transient'
+BROWSER = 'browser'
+
+# Page-level hiccups: the browser is fine and the action may simply be
+# retried later. InstaPy reports most of its own failures as RuntimeError.
+TRANSIENT_ERRORS = (
+    TimeoutException,
+    NoSuchElementException,
+    StaleElementReferenceException,
+    RuntimeError,
+)
+
+
+def classify_error(error: Exception) -> str:
+    """Return ``transient`` or ``browser`` (the session is unusable).
+
+    Only the errors the bot recovers from are classified; anything else
+    propagates out of the run loop untouched.
+    """
+    if isinstance(error, TRANSIENT_ERRORS):
+        return TRANSIENT
+    return BROWSER
+
+
+class Backoff:
+    """Exponential backoff with jitter.
+
+    Each delay is drawn from the upper half of ``base * 2**attempts``, capped
+    at ``cap``, so retries spread out without collapsing to zero.
+    """
+
+    def __init__(self, base: float, cap: float):
+        self.base = base
+        self.cap = cap
+        self.attempts = 0
+
+    def next_delay(self, rng) -> float:
+        delay = min(self.cap, self.base * 2**self.attempts)
+        self.attempts += 1
+        return rng.uniform(delay / 2, delay)
+
+    def reset(self):
+        self.attempts = 0
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker guarding one action.
+
+    ``threshold`` consecutive failures open the circuit for ``cooldown``
+    seconds; the first call afterwards is a half-open trial that closes it
+    on success or re-opens it for twice as long, up to ``max_cooldown``.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    STATES = (CLOSED, HALF_OPEN, OPEN)
+
+    def __init__(self, name: str, clock: Clock, settings: 'RecoverySettings'):
+        self.name = name
+        self.clock = clock
+        self.settings = settings
+        self.state = self.CLOSED
+        self.failures = 0
+        self.cooldown = settings.breaker_cooldown
+        self.open_until = 0.0
+        self.backoff = Backoff(
+            settings.action_backoff_base, settings.action_backoff_cap
+        )
+
+    def allow(self) -> bool:
+        if self.state != self.OPEN:
+            return True
+        if self.clock.monotonic() < self.open_until:
+            return False
+        self.state = self.HALF_OPEN
+        logger.info("Circuit for %s is half-open, allowing a trial run", self.name)
+        return True
+
+    def success(self):
+        if self.state != self.CLOSED:
+            logger.info("Circuit for %s closed", self.name)
+        self.state = self.CLOSED
+        self.failures = 0
+        self.cooldown = self.settings.breaker_cooldown
+        self.backoff.reset()
+
+    def failure(self, rng) -> float:
+        """Count a failure and return how long to back off before going on."""
+        self.failures += 1
+        if self.state == self.HALF_OPEN:
+            self.cooldown = min(self.cooldown * 2, self.settings.breaker_max_cooldown)
+            self._open()
+        elif self.failures >= self.settings.breaker_threshold:
+            self._open()
+        return self.backoff.next_delay(rng)
+
+    def _open(self):
+        self.state = self.OPEN
+        self.open_until = self.clock.monotonic() + self.cooldown
+        logger.warning(
+            "Circuit for %s opened after %s failures, skipping it for %.0f minutes",
+            self.name,
+            self.failures,
+            self.cooldown / 60,
+        )
+
+
+class StackSampler:
+    """Samples one thread's Python stack on a timer into collapsed stacks.
+
+    Each sample is a ``root;...;leaf`` line prefixed with the current label,
+    the format flamegraph.pl, inferno and speedscope read.
+    """
+
+    def __init__(self, thread_id: int, interval: float, label: Callable[[], str]):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.label = label
+        self.counts: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name='stack-sampler', daemon=True
+        )
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                module = os.path.splitext(os.path.basename(code.co_filename))[0]
+                stack.append(f"{module}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                stack.append(self.label())
+                self.counts[';'.join(reversed(stack))] += 1
+
+    def write(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class Profiler:
+    """Opt-in per-cycle profiling of :meth:`InstagramBot.execute_cycle`.
+
+    ``profiling.mode`` selects cProfile (``.pstats``), the stack sampler
+    (``.collapsed``) or both. Profiling follows ``profiling.enabled`` and
+    :meth:`toggle` flips it at runtime (SIGUSR1 under the orchestrator).
+    """
+
+    MODES = ('cprofile', 'sampling', 'both')
+
+    def __init__(self, settings: 'ProfilingSettings', clock: Clock):
+        self.settings = settings
+        self.clock = clock
+        self.active = settings.enabled
+        self.label = 'cycle'
+        self.sequence = 0
+
+    def toggle(self):
+        self.active = not self.active
+        profile_logger.info("Profiling %s", 'enabled' if self.active else 'disabled')
+
+    def configure(self, settings: 'ProfilingSettings'):
+        if settings.enabled != self.settings.enabled:
+            self.active = settings.enabled
+        self.settings = settings
+
+    @contextmanager
+    def action(self, name: str):
+        """Label stack samples taken while ``name`` runs."""
+        self.label = name
+        try:
+            yield
+        finally:
+            self.label = 'cycle'
+
+    @contextmanager
+    def cycle(self):
+        if not self.active:
+            yield
+            return
+
+        mode = self.settings.mode
+        profile = sampler = None
+        if mode in ('sampling', 'both'):
+            sampler = StackSampler(
+                threading.get_ident(), self.settings.interval, lambda: self.label
+            )
+            sampler.start()
+        if mode in ('cprofile', 'both'):
+            profile = cProfile.Profile()
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+            if sampler is not None:
+                sampler.stop()
+            try:
+                self._write(profile, sampler)
+            except OSError as e:
+                profile_logger.warning("Could not write cycle profile: %s", e)
+
+    def _write(
+        self, profile: Optional[cProfile.Profile], sampler: Optional[StackSampler]
+    ):
+        os.makedirs(self.settings.output_dir, exist_ok=True)
+        self.sequence += 1
+        base = os.path.join(
+            self.settings.output_dir,
+            f"cycle-{self.clock.now():%Y%m%d-%H%M%S}-{self.sequence:04d}",
+        )
+        if profile is not None:
+            profile.dump_stats(base + '.pstats')
+        if sampler is not None:
+            sampler.write(base + '.collapsed')
+        profile_logger.info("Wrote cycle profile %s", base)
+        self._prune()
+
+    def _prune(self):
+        directory = self.settings.output_dir
+        stems = sorted(
+            {
+                os.path.splitext(name)[0]
+                for name in os.listdir(directory)
+                if name.startswith('cycle-')
+            }
+        )
+        for stem in stems[: -self.settings.keep]:
+            for suffix in ('.pstats', '.collapsed'):
+                try:
+                    os.remove(os.path.join(directory, stem + suffix))
+                except FileNotFoundError:
+                    pass
+
+
+class DecisionLog:
+    """Compact JSONL record of one run's random draws and action outcomes.
+
+    The first line holds the seed, start time and the state restored from
+    the ledger; after that every draw is ``{"r": kind, "v": value}`` and
+    every finished action ``{"a": name, "t": offset, "d": duration, "e":
+    exception type, "n": interactions}`` and every new browser session
+    ``{"login": duration}``, with times in seconds.
+    :func:`replay` re-drives a run from this file.
+    """
+
+    def __init__(self, settings: 'DecisionSettings', start: datetime, header: Dict):
+        os.makedirs(settings.output_dir, exist_ok=True)
+        self.settings = settings
+        self.path = os.path.join(
+            settings.output_dir, f"run-{start:%Y%m%d-%H%M%S}.jsonl"
+        )
+        self.start = start
+        self._lock = threading.Lock()
+        self.file = open(self.path, 'a', encoding='utf-8', buffering=1)
+        self.write(header)
+        self._prune()
+        replay_logger.info("Recording decisions to %s", self.path)
+
+    def elapsed(self, moment: datetime) -> float:
+        return (moment - self.start).total_seconds()
+
+    def write(self, entry: Dict):
+        line = json.dumps(entry, separators=(',', ':')) + '\n'
+        with self._lock:
+            if not self.file.closed:
+                self.file.write(line)
+
+    def close(self):
+        with self._lock:
+            self.file.close()
+
+    def _prune(self):
+        directory = self.settings.output_dir
+        runs = sorted(name for name in os.listdir(directory) if name.startswith('run-'))
+        for name in runs[: -self.settings.keep]:
+            os.remove(os.path.join(directory, name))
+
+
+class RecordedRandom(random.Random):
+    """``random.Random`` that writes every draw the bot makes to a log.
+
+    Only the methods the bot calls are recorded; ``uniform`` goes through
+    :meth:`random` and so is recorded once.
+    """
+
+    def __init__(self, seed: Optional[int] = None, log: Optional[DecisionLog] = None):
+        self.log = log
+        super().__init__(seed)
+
+    def _record(self, kind: str, value):
+        if self.log is not None:
+            self.log.write({'r': kind, 'v': value})
+        return value
+
+    def getrandbits(self, k: int) -> int:
+        # Defining this keeps integer draws on getrandbits instead of the
+        # recorded random(), so each randint is recorded once.
+        return super().getrandbits(k)
+
+    def random(self) -> float:
+        return self._record('random', super().random())
+
+    def randint(self, a: int, b: int) -> int:
+        return self._record('randint', super().randint(a, b))
+
+    def choice(self, seq: Sequence):
+        return seq[self._record('choice', super().randrange(len(seq)))]
+
+    def shuffle(self, x: List):
+        order = list(range(len(x)))
+        super().shuffle(order)
+        x[:] = [x[i] for i in self._record('shuffle', order)]
+
+
+class ReplayRandom(RecordedRandom):
+    """Returns the draws of a recorded run in order.
+
+    Once the bot asks for a draw of a different kind than the recording
+    holds next, the run has diverged and the rest comes from the seed.
+    """
+
+    def __init__(self, decisions: Sequence[Dict], seed: Optional[int] = None):
+        self.decisions = deque(decisions)
+        self.replayed = 0
+        self.diverged = False
+        super().__init__(seed)
+
+    def _replay(self, kind: str, check: Callable = lambda value: True):
+        if not self.diverged:
+            if self.decisions and self.decisions[0]['r'] == kind:
+                value = self.decisions[0]['v']
+                if check(value):
+                    self.decisions.popleft()
+                    self.replayed += 1
+                    return value
+            self.diverged = True
+            replay_logger.warning(
+                "Replay diverged after %s decisions, continuing from the seed",
+                self.replayed,
+            )
+        return None
+
+    def random(self) -> float:
+        value = self._replay('random')
+        return super().random() if value is None else value
+
+    def randint(self, a: int, b: int) -> int:
+        value = self._replay('randint', lambda v: a <= v <= b)
+        return super().randint(a, b) if value is None else value
+
+    def choice(self, seq: Sequence):
+        index = self._replay('choice', lambda v: v < len(seq))
+        return super().choice(seq) if index is None else seq[index]
+
+    def shuffle(self, x: List):
+        order = self._replay('shuffle', lambda v: len(v) == len(x))
+        if order is None:
+            super().shuffle(x)
+        else:
+            x[:] = [x[i] for i in order]
+
+
+# Share of liked posts InstaPy comments on; every comment is an interaction.
+COMMENT_PERCENTAGE = 20
+
+
+class PlannedAction:
+    """One action of a cycle with its amount and expected timing."""
+
+    __slots__ = ('action', 'amount', 'pause', 'expected')
+
+    def __init__(self, action: Callable, amount: int, pause: int, expected: float):
+        self.action = action
+        self.amount = amount
+        self.pause = pause
+        self.expected = expected
+
+    @property
+    def name(self) -> str:
+        return self.action.__name__
+
+
+class CyclePlanner:
+    """Decides which actions and amounts fit before the next schedule transition.
+
+    Each action type has an amount range, the number of targets its amount is
+    multiplied by, and a fallback duration per interaction. Measured
+    durations from the ledger replace the fallbacks and are then smoothed
+    with every completed action. The daily budget is paced over the day's
+    active time: each cycle aims at what should have been spent half an hour
+    of active time from now, less what was already spent today.
+    Behind pace, amounts move up their range; ahead of it they move down to
+    their minimum and trailing actions are skipped, so the budget is
+    neither exhausted early nor stranded at night.
+
+    Likes may also draw a comment. Pacing counts the expected comments of
+    each action and the hard budget counts one per like, so comments never
+    push the day past its limit.
+    """
+
+    # name: (min amount, max amount, targets per action, seconds per interaction)
+    PROFILES = {
+        'interact_feed': (5, 15, 1, 20.0),
+        'engage_location': (4, 8, 2, 20.0),
+        'engage_hashtags': (5, 10, 3, 20.0),
+        'engage_users': (5, 8, 2, 45.0),
+        'unfollow': (10, 15, 1, 45.0),
+    }
+    SMOOTHING = 0.3
+    MIN_RATE = 1.0
+    ACTION_DELAY = 30
+    PAUSE = (30, 180)
+    # Active seconds ahead a cycle may spend the budget for.
+    HORIZON = 1800
+    # Actions whose likes InstaPy may comment on.
+    COMMENTING = frozenset({'interact_feed', 'engage_location', 'engage_hashtags'})
+
+    def __init__(self, bot: 'InstagramBot'):
+        self.bot = bot
+        self.rates = {name: profile[3] for name, profile in self.PROFILES.items()}
+        self.rates.update(bot.ledger.seconds_per_interaction(bot.clock.now()))
+
+    def observe(self, name: str, duration: float, interactions: int):
+        if name not in self.rates or interactions <= 0:
+            return
+        rate = duration / interactions
+        self.rates[name] += self.SMOOTHING * (rate - self.rates[name])
+
+    def cost(self, name: str) -> Tuple[float, int]:
+        """Expected and largest number of interactions per unit of amount."""
+        targets = self.PROFILES[name][2]
+        if name not in self.COMMENTING:
+            return targets, targets
+        return targets * (1 + COMMENT_PERCENTAGE / 100), targets * 2
+
+    def plan(self, actions: List[Callable], remaining: int) -> List[PlannedAction]:
+        now = self.bot.clock.now()
+        schedule = self.bot.schedule
+        time_left = (schedule.next_transition(now) - now).total_seconds()
+        active_left = max(schedule.active_seconds_left_today(now), time_left, 1.0)
+        midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        active_total = max(schedule.active_seconds_left_today(midnight), active_left)
+        # Interactions still due within the horizon to use the budget evenly;
+        # spent and remaining together are the daily budget.
+        spent = self.bot.daily_interactions
+        horizon = min(time_left, self.HORIZON)
+        due = (spent + remaining) * (1 - (active_left - horizon) / active_total)
+        target = min(due - spent, remaining)
+
+        draws = [
+            (action, self.bot.rng.randint(*self.PROFILES[action.__name__][:2]))
+            for action in actions
+        ]
+        drawn = sum(amount * self.cost(a.__name__)[0] for a, amount in draws)
+        # Move every amount towards the target, within its profile's range.
+        scale = max(target, 0) / drawn if drawn else 1.0
+
+        planned = []
+        for action, amount in draws:
+            low, high = self.PROFILES[action.__name__][:2]
+            expected, most = self.cost(action.__name__)
+            rate = max(self.rates[action.__name__], self.MIN_RATE) * expected
+            pause = self.bot.rng.randint(*self.PAUSE)
+            gap = max(pause, self.ACTION_DELAY)
+            if target <= 0:
+                logger.info(
+                    "Skipping %s: %s interactions ahead of the daily pace",
+                    action.__name__,
+                    round(-target),
+                )
+                continue
+            amount = min(
+                high,
+                max(low, round(amount * scale)),
+                remaining // most,
+                int((time_left - gap) // rate),
+            )
+            if amount <= 0:
+                logger.info(
+                    "Skipping %s: %.0f seconds and %s interactions left",
+                    action.__name__,
+                    time_left,
+                    remaining,
+                )
+                continue
+
+            expected = amount * rate
+            planned.append(PlannedAction(action, amount, pause, expected))
+            time_left -= expected + gap
+            remaining -= amount * most
+            target -= amount * expected
+
+        logger.info(
+            "Planned %s/%s actions, %s interactions in %.0f seconds",
+            len(planned),
+            len(actions),
+            round(sum(p.amount * self.cost(p.name)[0] for p in planned)),
+            sum(p.expected + p.pause for p in planned),
+        )
+        return planned
+
+
+class InstagramBot:
+    def __init__(
+        self,
+        config_path: str = 'config.yaml',
+        clock: Optional[Clock] = None,
+        backend=None,
+        rng: Optional[random.Random] = None,
+        ledger: Optional[ActionLedger] = None,
+        profile_cache: bool = True,
+    ):
+        logger.info("Initializing InstagramBot with config path: %s", config_path)
+        self.startup = StartupReport()
+        with self.startup.phase('config_load'):
+            self.config = Config(config_path)
+        logger.info("Config loaded successfully")
 
-            required_keys = ['auth', 'limits', 'targeting', 'engagement', 'schedule']
-            missing_keys = [key for key in required_keys if key not in config]
-            if missing_keys:
-                logging.error(
-                    f"Configuration validation failed. Missing keys: {missing_keys}"
+        self.clock = clock or Clock()
+        self.config_watcher = ConfigWatcher(config_path, self.config.reload.interval)
+        if backend is None:
+            if self.config.worker.enabled:
+                cache = self.config.profile_cache
+                backend = WorkerBackend(
+                    self.config.worker,
+                    InstaPyBackend,
+                    (self.config.browser,),
+                    self.config.logging,
+                    self.startup,
+                    cache if profile_cache and cache.enabled else None,
+                    self.config.waits,
                 )
-                raise ConfigError(f"Missing required config keys: {missing_keys}")
-
-            logging.debug("Loading configuration values")
-            self.username = config['auth']['credentials']['username']
-            logging.info(f"Configured username: {self.username}")
-            self.password = "********"  # Mask password in logs
-            logging.debug("Password loaded (masked)")
+            else:
+                backend = InstaPyBackend(self.config.browser, self.startup)
+        self.backend = backend
 
-            self.max_daily_interactions = config['limits']['interactions']['max_daily']
-            logging.info(
-                f"Maximum daily interactions set to: {self.max_daily_interactions}"
+        if ledger is None:
+            settings = self.config.ledger
+            ledger = ActionLedger(
+                settings.path,
+                batch_size=settings.batch_size,
+                flush_interval=settings.flush_interval,
             )
+        self.ledger = ledger
+        self.daily_interactions = self.ledger.interactions_today(self.clock.now())
+        logger.info(
+            "Daily interactions restored from ledger: %s", self.daily_interactions
+        )
 
-            self.locations = config['targeting']['locations']
-            logging.info(f"Loaded {len(self.locations)} target locations")
+        self.decision_log: Optional[DecisionLog] = None
+        self.rng = rng or self._recorded_rng()
 
-            self.hashtags = config['targeting']['hashtags']
-            logging.info(f"Loaded {len(self.hashtags)} target hashtags")
+        logger.info("Initializing schedule")
+        self._init_schedule()
+        logger.info("Schedule initialized successfully")
 
-            self.target_accounts = config['targeting']['accounts']
-            logging.info(f"Loaded {len(self.target_accounts)} target accounts")
+        self.last_action_time = self.clock.now()
+        logger.info("Last action time initialized to: %s", self.last_action_time)
 
-            self.hourly_limits = config['engagement']['hourly_limits']
-            logging.info(f"Hourly interaction limits configured: {self.hourly_limits}")
+        self.session = None
+        self.sessions = SessionManager(self)
+        self.watchdog = MemoryWatchdog(self.config.memory, self.clock)
+        self.profiler = Profiler(self.config.profiling, self.clock)
+        logger.info("Session initialized to None")
 
-            self.active_hours = config['schedule']['active_hours']
-            logging.info(f"Active hours configured: {self.active_hours}")
+        self.planner = CyclePlanner(self)
+        if self.decision_log is not None:
+            self.decision_log.write({'rates': self.planner.rates})
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.session_backoff = Backoff(
+            self.config.recovery.session_backoff_base,
+            self.config.recovery.session_backoff_cap,
+        )
+        self.retry_count = 0
+        self.target_index = TargetIndex(
+            self.config.targets, self.config.target_cooldown, self.clock
+        )
 
-            self.breaks = config['schedule']['breaks']
-            logging.info("Break schedule loaded")
+        self.metrics = Metrics()
+        self._describe_metrics()
+        self.metrics_server: Optional[MetricsServer] = None
+        self._follow_callbacks: Dict[str, Callable] = {}
+        self.waits = PageWaits(self.config.waits, self.clock, self.metrics)
+        self.profile_cache: Optional[ProfileCache] = None
+        # A worker backend opens the cache in each worker instead.
+        if (
+            profile_cache
+            and self.config.profile_cache.enabled
+            and not isinstance(self.backend, WorkerBackend)
+        ):
+            self.profile_cache = ProfileCache(
+                self.config.profile_cache, self.clock, self.metrics
+            )
 
-            self.relationship_bounds = config['limits']['relationship_bounds']
-            logging.info(f"Relationship bounds set: {self.relationship_bounds}")
+    def _describe_metrics(self):
+        for name, kind, help_text in [
+            (
+                'instabot_action_duration_seconds',
+                'histogram',
+                "Time spent inside each action.",
+            ),
+            (
+                'instabot_action_results_total',
+                'counter',
+                "Action outcomes by action, outcome and exception type.",
+            ),
+            (
+                'instabot_recovery_sleep_seconds_total',
+                'counter',
+                "Seconds slept recovering from errors, by exception type.",
+            ),
+            (
+                'instabot_cycle_duration_seconds',
+                'histogram',
+                "Wall time of execute_cycle, including delays between actions.",
+            ),
+            (
+                'instabot_session_duration_seconds',
+                'histogram',
+                "Wall time of one session of cycles in the run loop.",
+            ),
+            ('instabot_sessions', 'gauge', "Session manager cold starts and reuses."),
+            (
+                'instabot_workers',
+                'gauge',
+                "Browser worker launches, standby takeovers and standby readiness.",
+            ),
+            ('instabot_targets', 'gauge', "Targets available and cooling down."),
+            (
+                'instabot_browser_rss_bytes',
+                'gauge',
+                "Resident memory of the geckodriver/Firefox process tree.",
+            ),
+            ('instabot_page_loads_total', 'counter', "Page navigations by action."),
+            (
+                'instabot_page_load_seconds_total',
+                'counter',
+                "Seconds spent in page navigations by action.",
+            ),
+            (
+                'instabot_page_bytes_total',
+                'counter',
+                "Bytes transferred (Performance API transferSize) by action.",
+            ),
+            (
+                'instabot_wait_seconds',
+                'gauge',
+                "Current implicit wait and page load timeout set on the browser.",
+            ),
+            (
+                'instabot_wait_saved_seconds_total',
+                'counter',
+                "Seconds saved on missing-element probes against the maximum wait.",
+            ),
+            (
+                'instabot_follows',
+                'gauge',
+                "Accounts in the follow ledger by state.",
+            ),
+            (
+                'instabot_profile_cache_total',
+                'counter',
+                "Profile cache lookups by result (hit or miss, expired counts as miss).",
+            ),
+            (
+                'instabot_profile_cache_pages_saved_total',
+                'counter',
+                "Profile page loads skipped because a cached profile was rejected.",
+            ),
+            (
+                'instabot_profile_cache_entries',
+                'gauge',
+                "Profiles currently held in the profile cache.",
+            ),
+            (
+                'instabot_prefetch_saved_seconds_total',
+                'counter',
+                "Action setup seconds moved into the pause before the action.",
+            ),
+            (
+                'instabot_circuit_state',
+                'gauge',
+                "Per-action circuit breaker state: 0 closed, 1 half-open, 2 open.",
+            ),
+            (
+                'instabot_interactions',
+                'gauge',
+                "Interactions recorded in the ledger for the current day and hour.",
+            ),
+        ]:
+            self.metrics.describe(name, kind, help_text)
 
-            logging.info("Configuration loaded successfully")
+    def start_metrics(self):
+        settings = self.config.metrics
+        if settings.port:
+            self.metrics_server = MetricsServer(
+                self.metrics, settings.host, settings.port
+            )
+            self.metrics_server.start()
 
-        except yaml.YAMLError as e:
-            logging.critical(f"Failed to parse YAML configuration: {str(e)}")
-            raise ConfigError(f"YAML parsing error: {str(e)}")
-        except KeyError as e:
-            logging.critical(f"Invalid configuration structure. Missing key: {str(e)}")
-            raise ConfigError(f"Missing config key: {str(e)}")
-        except FileNotFoundError as e:
-            logging.critical(f"Configuration file not found: {str(e)}")
-            raise ConfigError(f"Config file not found: {str(e)}")
+    def stop_metrics(self):
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+            self.metrics_server = None
+        self.export_metrics()
 
+    def export_metrics(self):
+        for kind, value in self.sessions.stats().items():
+            self.metrics.set('instabot_sessions', value, kind=kind)
+        worker_stats = getattr(self.backend, 'stats', None)
+        if worker_stats is not None:
+            for kind, value in worker_stats().items():
+                self.metrics.set('instabot_workers', value, kind=kind)
+        for name, breaker in self.breakers.items():
+            self.metrics.set(
+                'instabot_circuit_state',
+                CircuitBreaker.STATES.index(breaker.state),
+                action=name,
+            )
+        for kind, (available, cooling) in self.target_index.counts().items():
+            self.metrics.set(
+                'instabot_targets', available, kind=kind, state='available'
+            )
+            self.metrics.set('instabot_targets', cooling, kind=kind, state='cooling')
+        self.metrics.set('instabot_wait_seconds', self.waits.implicit, kind='implicit')
+        self.metrics.set(
+            'instabot_wait_seconds', self.waits.page_load, kind='page_load'
+        )
+        for state, value in self.ledger.follow_counts().items():
+            self.metrics.set('instabot_follows', value, state=state)
+        if self.profile_cache is not None:
+            self.metrics.set('instabot_profile_cache_entries', self.profile_cache.size)
+        now = self.clock.now()
+        self.metrics.set(
+            'instabot_interactions', self.ledger.interactions_today(now), window='day'
+        )
+        self.metrics.set(
+            'instabot_interactions',
+            self.ledger.interactions_this_hour(now),
+            window='hour',
+        )
+        path = self.config.metrics.file
+        if path:
+            try:
+                self.metrics.write(path)
+            except OSError as e:
+                metrics_logger.warning("Could not write metrics to %s: %s", path, e)
 
-class InstagramBot:
-    def __init__(self, config_path: str = 'config.yaml'):
-        logging.info(f"Initializing InstagramBot with config path: {config_path}")
-        self.config = Config(config_path)
-        logging.info("Config loaded successfully")
+    def reload_config(self) -> bool:
+        """Swap in an edited config file without touching the browser.
 
-        self.daily_interactions = 0
-        logging.info("Daily interactions counter initialized to 0")
+        Called at safe points of the run loop. An invalid file is logged and
+        ignored, so the bot keeps running on the last good config. Changed
+        limits and bounds are re-applied to the live session in place.
+        """
+        if not self.config.reload.enabled:
+            return False
+        if not self.config_watcher.changed(self.clock.monotonic()):
+            return False
 
-        self.weekend = datetime.now().weekday() >= 5
-        logging.info(f"Weekend status set to: {self.weekend}")
+        config_logger.info("Config file changed, reloading %s", self.config.path)
+        try:
+            with self.startup.phase('config_load'):
+                config = Config(self.config.path)
+        except ConfigError as e:
+            config_logger.error("Keeping current config, reload failed: %s", e)
+            return False
 
-        logging.info("Initializing schedule")
-        self._init_schedule()
-        logging.info("Schedule initialized successfully")
+        previous, self.config = self.config, config
+        self.config_watcher.interval = config.reload.interval
+        if (config.active_hours, config.breaks) != (
+            previous.active_hours,
+            previous.breaks,
+        ):
+            self._init_schedule()
+        if config.targets != previous.targets:
+            self.target_index.rebuild(config.targets)
+        self.target_index.settings = config.target_cooldown
+        self.watchdog.settings = config.memory
+        self.profiler.configure(config.profiling)
+        self.waits.configure(config.waits)
+        if isinstance(self.session, RemoteSession):
+            try:
+                self.session.run(configure_page_waits, config.waits)
+            except WebDriverException:
+                config_logger.debug(
+                    "Browser worker missed the new waits", exc_info=True
+                )
+        if config.recovery != previous.recovery:
+            self.breakers.clear()
+            self.session_backoff = Backoff(
+                config.recovery.session_backoff_base,
+                config.recovery.session_backoff_cap,
+            )
+        if config.logging != previous.logging and logging_configured():
+            setup_logging(config.logging)
+        if config.metrics != previous.metrics and self.metrics_server is not None:
+            self.stop_metrics()
+            self.start_metrics()
+        for section in ('browser', 'ledger', 'profile_cache', 'decisions', 'worker'):
+            if getattr(config, section) != getattr(previous, section):
+                config_logger.warning(
+                    "Changes to %s settings take effect after a restart", section
+                )
+        if self.sessions.session is not None:
+            self.sessions._reconfigure(self.get_session_settings())
+        config_logger.info("Configuration reloaded")
+        return True
 
-        self.last_action_time = datetime.now()
-        logging.info(f"Last action time initialized to: {self.last_action_time}")
+    @property
+    def weekend(self) -> bool:
+        return self.clock.now().weekday() >= 5
 
-        self.session = None
-        logging.info("Session initialized to None")
+    def _record_action(
+        self, action_name: str, span: ActionSpan, error: Optional[Exception] = None
+    ):
+        span.finish()
+        span.error = error
+        if error is None:
+            outcome = 'success'
+        elif isinstance(error, Interrupted):
+            outcome = 'interrupted'
+        elif isinstance(error, TimeoutException):
+            outcome = 'timeout'
+        else:
+            outcome = 'error'
+        self.metrics.observe(
+            'instabot_action_duration_seconds', span.duration, action=action_name
+        )
+        if span.page_stats is not None:
+            self.metrics.inc(
+                'instabot_page_loads_total', span.pages, action=action_name
+            )
+            self.metrics.inc(
+                'instabot_page_load_seconds_total',
+                span.load_seconds,
+                action=action_name,
+            )
+            self.metrics.inc(
+                'instabot_page_bytes_total', span.bytes, action=action_name
+            )
+            logger.info(
+                "Action %s loaded %s pages in %.1fs, %.1f KiB transferred",
+                action_name,
+                span.pages,
+                span.load_seconds,
+                span.bytes / 1024,
+            )
+        self.metrics.inc(
+            'instabot_action_results_total',
+            action=action_name,
+            outcome=outcome,
+            exception=type(error).__name__ if error is not None else '',
+        )
+        self.ledger.record(
+            self.clock.now(), action_name, outcome, span.interactions, span.duration
+        )
+        if self.decision_log is not None:
+            self.decision_log.write(
+                {
+                    'a': action_name,
+                    't': round(self.decision_log.elapsed(self.clock.now()), 3),
+                    'd': round(span.duration, 3),
+                    'e': type(error).__name__ if error is not None else None,
+                    'n': span.interactions,
+                }
+            )
+        self.daily_interactions += span.interactions
+        if outcome == 'error':
+            # Browser and runtime failures say nothing about the targets.
+            self.target_index.discard_pending()
+        else:
+            self.target_index.record(span.interactions, span.duration)
+        if error is None:
+            self.planner.observe(action_name, span.duration, span.interactions)
+        if isinstance(error, TimeoutException):
+            self.waits.fallback()
+        else:
+            self.waits.apply()
+
+    def _recovery_sleep(self, reason: str, seconds: float):
+        self.metrics.inc(
+            'instabot_recovery_sleep_seconds_total', seconds, reason=reason
+        )
+        self.clock.sleep(seconds)
+
+    def breaker(self, action_name: str) -> CircuitBreaker:
+        breaker = self.breakers.get(action_name)
+        if breaker is None:
+            breaker = self.breakers[action_name] = CircuitBreaker(
+                action_name, self.clock, self.config.recovery
+            )
+        return breaker
 
     @contextmanager
-    def error_handling(self, action_name: str):
-        logging.info(f"Entering error handling context for action: {action_name}")
+    def error_handling(self, action_name: str, session=None):
+        logger.info("Entering error handling context for action: %s", action_name)
+        span = ActionSpan(self.clock, session)
+        breaker = self.breaker(action_name)
         try:
-            logging.debug(f"Attempting action: {action_name}")
-            yield
-            logging.info(f"Action completed successfully: {action_name}")
-        except WebDriverException as e:
-            logging.error(f"Selenium error in {action_name}: {str(e)}", exc_info=True)
-            if self.session and self.session.browser:
-                logging.info("Attempting to quit browser session")
-                self.session.browser.quit()
-                logging.info("Browser session quit successfully")
-            self.session = None
-            logging.info("Sleeping for 300 seconds after WebDriver error")
-            time_module.sleep(300)
-        except (TimeoutException, NoSuchElementException) as e:
-            logging.error(f"Navigation error in {action_name}: {str(e)}", exc_info=True)
-            logging.info("Sleeping for 60 seconds after navigation error")
-            time_module.sleep(60)
-        except RuntimeError as e:
-            logging.error(f"Runtime error in {action_name}: {str(e)}", exc_info=True)
-            logging.info("Sleeping for 30 seconds after runtime error")
-            time_module.sleep(30)
+            logger.debug("Attempting action: %s", action_name)
+            yield span
+            self._record_action(action_name, span)
+            breaker.success()
+            logger.info("Action completed successfully: %s", action_name)
+        except Interrupted as e:
+            # Shutdown during the pause after an action: keep what it did.
+            self._record_action(action_name, span, e)
+            raise
+        except (WebDriverException, RuntimeError) as e:
+            self._record_action(action_name, span, e)
+            delay = breaker.failure(self.rng)
+            if classify_error(e) == BROWSER:
+                logger.error(
+                    "Selenium error in %s (%s): %s",
+                    action_name,
+                    type(e).__name__,
+                    e,
+                    exc_info=True,
+                )
+                logger.info("Attempting to quit browser session")
+                self.sessions.discard()
+                self.session = None
+                if self.standby_ready():
+                    delay = self.config.worker.takeover_delay
+                    logger.info(
+                        "Standby browser worker takes over in %.0f seconds", delay
+                    )
+                else:
+                    logger.info(
+                        "Sleeping for %.0f seconds after WebDriver error", delay
+                    )
+            elif isinstance(e, RuntimeError):
+                logger.error(
+                    "Runtime error in %s (%s): %s",
+                    action_name,
+                    type(e).__name__,
+                    e,
+                    exc_info=True,
+                )
+                logger.info("Sleeping for %.0f seconds after runtime error", delay)
+            else:
+                logger.error(
+                    "Navigation error in %s (%s): %s",
+                    action_name,
+                    type(e).__name__,
+                    e,
+                    exc_info=True,
+                )
+                logger.info("Sleeping for %.0f seconds after navigation error", delay)
+            self._recovery_sleep(type(e).__name__, delay)
+
+    def _recorded_rng(self) -> RecordedRandom:
+        settings = self.config.decisions
+        seed = settings.seed
+        if seed is None:
+            seed = random.SystemRandom().randrange(2**32)
+        if settings.enabled:
+            now = self.clock.now()
+            self.decision_log = DecisionLog(
+                settings,
+                now,
+                {
+                    'seed': seed,
+                    'start': now.isoformat(),
+                    'interactions': self.daily_interactions,
+                },
+            )
+        logger.info("Random seed for this run: %s", seed)
+        return RecordedRandom(seed, self.decision_log)
 
     def _init_schedule(self):
-        logging.info("Initializing schedule with breaks configuration")
+        schedule_logger.info("Initializing schedule with breaks configuration")
         try:
             breaks_config = self.config.breaks
-            logging.debug(f"Breaks config loaded: {breaks_config}")
+            schedule_logger.debug("Breaks config loaded: %s", breaks_config)
 
-            logging.info("Setting up bathroom breaks schedule")
+            schedule_logger.info("Setting up bathroom breaks schedule")
             bathroom_breaks = []
-            for period in ['morning', 'afternoon', 'evening']:
-                hour_start = breaks_config['bathroom'][period]['hour_start']
-                hour_end = breaks_config['bathroom'][period]['hour_end']
-                random_hour = random.randint(hour_start, hour_end)
-                random_minute = random.randint(0, 59)
+            for period, window in zip(Breaks.PERIODS, breaks_config.bathroom):
+                random_hour = self.rng.randint(window.hour_start, window.hour_end)
+                random_minute = self.rng.randint(0, 59)
                 bathroom_breaks.append(time(random_hour, random_minute))
-                logging.debug(
-                    f"Added {period} bathroom break at {random_hour}:{random_minute}"
+                schedule_logger.debug(
+                    "Added %s bathroom break at %s:%s",
+                    period,
+                    random_hour,
+                    random_minute,
                 )
 
-            logging.info("Setting up lunch break schedule")
-            lunch_hour = random.randint(
-                breaks_config['lunch']['hour_start'], breaks_config['lunch']['hour_end']
+            schedule_logger.info("Setting up lunch break schedule")
+            lunch_hour = self.rng.randint(
+                breaks_config.lunch.hour_start, breaks_config.lunch.hour_end
             )
-            lunch_minute = random.randint(0, 59)
+            lunch_minute = self.rng.randint(0, 59)
 
             self.breaks = {
                 'bathroom': bathroom_breaks,
                 'lunch': time(lunch_hour, lunch_minute),
             }
+            self.schedule = ScheduleIndex(
+                self.config.active_hours, self.breaks, self.rng.randint(30, 60)
+            )
 
-            logging.info(
-                f"Schedule initialized with lunch at {lunch_hour}:{lunch_minute}"
+            schedule_logger.info(
+                "Schedule initialized with lunch at %s:%s", lunch_hour, lunch_minute
             )
-            logging.debug(f"Complete break schedule: {self.breaks}")
+            schedule_logger.debug("Complete break schedule: %s", self.breaks)
 
         except KeyError as e:
             error_msg = f"Invalid breaks configuration: {str(e)}"
-            logging.error(error_msg, exc_info=True)
+            schedule_logger.error(error_msg, exc_info=True)
             raise ConfigError(error_msg)
 
     def is_active_hour(self) -> bool:
-        current = datetime.now().time()
-        active_hours = self.config.active_hours
-
-        logging.info(f"Checking active hours. Current time: {current}")
-        logging.debug(f"Full active hours config: {active_hours}")
-        logging.debug(f"Is weekend? {self.weekend}")
-
-        if self.weekend:
-            weekend = active_hours['weekend']
-            start = datetime.strptime(weekend['start'], "%H:%M").time()
-            end = datetime.strptime(weekend['end'], "%H:%M").time()
-            is_active = start <= current <= end
-
-            logging.info(f"Weekend schedule - Start: {start}, End: {end}")
-            logging.info(
-                f"Current time {current} is {'within' if is_active else 'outside'} weekend active hours"
-            )
-            return is_active
-
-        weekday = active_hours['weekday']
-        logging.debug(f"Weekday schedule: {weekday}")
-
-        morning_start = datetime.strptime(weekday['morning']['start'], "%H:%M").time()
-        morning_end = datetime.strptime(weekday['morning']['end'], "%H:%M").time()
-        lunch_start = datetime.strptime(weekday['lunch']['start'], "%H:%M").time()
-        lunch_end = datetime.strptime(weekday['lunch']['end'], "%H:%M").time()
-        evening_start = datetime.strptime(weekday['evening']['start'], "%H:%M").time()
-        evening_end = datetime.strptime(weekday['evening']['end'], "%H:%M").time()
-
-        logging.info(
-            f"""
-        Checking against weekday schedules:
-        Morning: {morning_start} - {morning_end}
-        Lunch:   {lunch_start} - {lunch_end}
-        Evening: {evening_start} - {evening_end}
-        Current: {current}
-        """
-        )
-
-        is_morning = morning_start <= current <= morning_end
-        is_lunch = lunch_start <= current <= lunch_end
-        is_evening = evening_start <= current <= evening_end
-
-        logging.debug(
-            f"Time period checks - Morning: {is_morning}, Lunch: {is_lunch}, Evening: {is_evening}"
-        )
-
-        is_active = is_morning or is_lunch or is_evening
-        logging.info(
-            f"Current time {current} is {'within' if is_active else 'outside'} active hours"
+        current = self.clock.now()
+        is_active = self.schedule.is_active(current)
+        schedule_logger.debug(
+            "Current time %s is %s active hours",
+            current.time(),
+            'within' if is_active else 'outside',
         )
-
         return is_active
 
     def enforce_action_delay(self):
-        logging.info("Enforcing action delay")
-        elapsed = (datetime.now() - self.last_action_time).total_seconds()
-        logging.debug(f"Time elapsed since last action: {elapsed} seconds")
+        logger.info("Enforcing action delay")
+        elapsed = (self.clock.now() - self.last_action_time).total_seconds()
+        logger.debug("Time elapsed since last action: %s seconds", elapsed)
 
         if elapsed < 30:
             delay = 30 - elapsed
-            logging.info(f"Enforcing delay of {delay} seconds")
-            time_module.sleep(delay)
+            logger.info("Enforcing delay of %s seconds", delay)
+            self.clock.sleep(delay)
+
+        self.last_action_time = self.clock.now()
+        logger.debug("Updated last action time to: %s", self.last_action_time)
 
-        self.last_action_time = datetime.now()
-        logging.debug(f"Updated last action time to: {self.last_action_time}")
+    def execute_cycle(self, session: 'InstaPy') -> int:
+        started = self.clock.monotonic()
+        try:
+            with self.profiler.cycle():
+                return self._execute_cycle(session)
+        finally:
+            self.metrics.observe(
+                'instabot_cycle_duration_seconds', self.clock.monotonic() - started
+            )
+            self.export_metrics()
 
-    def execute_cycle(self, session: InstaPy) -> None:
-        logging.info("Starting execution cycle")
+    def _execute_cycle(self, session: 'InstaPy') -> int:
+        logger.info("Starting execution cycle")
         actions = self._get_actions(session)
-        logging.debug(f"Retrieved {len(actions)} possible actions")
+        logger.debug("Retrieved %s possible actions", len(actions))
 
-        random.shuffle(actions)
-        logging.info("Actions shuffled randomly")
+        self.rng.shuffle(actions)
+        logger.info("Actions shuffled randomly")
 
-        for action in actions:
-            logging.info(f"Executing action: {action.__name__}")
-            with self.error_handling(action.__name__):
-                action()
-                logging.info(f"Action {action.__name__} completed successfully")
+        blocked = [a.__name__ for a in actions if not self.breaker(a.__name__).allow()]
+        if blocked:
+            logger.info("Skipping actions with open circuits: %s", blocked)
+            actions = [a for a in actions if a.__name__ not in blocked]
+
+        remaining = self.config.max_daily_interactions - self.daily_interactions
+        plan = self.planner.plan(actions, remaining)
+        prepared: Dict[int, Optional[Callable]] = {}
+        saved = 0.0
+        for index, planned in enumerate(plan):
+            logger.info("Executing action: %s", planned.name)
+            with self.error_handling(planned.name, session) as span:
+                with self.profiler.action(planned.name):
+                    if index in prepared:
+                        run = prepared.pop(index)
+                    else:
+                        run = planned.action(planned.amount)
+                    if run is not None:
+                        run()
+                span.finish()
+                logger.info("Action %s completed successfully", planned.name)
 
                 self.enforce_action_delay()
-                sleep_time = random.randint(30, 180)
-                logging.info(f"Sleeping for {sleep_time} seconds between actions")
-                time_module.sleep(sleep_time)
+                prep = 0.0
+                if index + 1 < len(plan):
+                    self.reload_config()
+                    started = self.clock.monotonic()
+                    following = self.prefetch(plan[index + 1])
+                    prep = self.clock.monotonic() - started
+                    if following is not False:
+                        prepared[index + 1] = following
+                saved += min(prep, planned.pause)
+                pause = max(planned.pause - prep, 0)
+                logger.info("Sleeping for %.0f seconds between actions", pause)
+                self.clock.sleep(pause)
+                if index + 1 == len(plan):
+                    self.reload_config()
+            if span.error is not None and classify_error(span.error) == BROWSER:
+                logger.warning("Browser session lost, ending cycle early")
+                break
+            if self.check_memory(planned.name, boundary=False):
+                break
+        if saved:
+            self.metrics.inc('instabot_prefetch_saved_seconds_total', saved)
+            logger.info("Prefetch saved %.1f seconds of action setup this cycle", saved)
+        return len(plan)
+
+    def prefetch(self, planned: PlannedAction):
+        """Prepare ``planned`` during the pause before it.
+
+        Only the setup runs here (targets, ledger queries, session settings);
+        pages are loaded by the returned call when the action starts.
+        Returns that call (None if there is nothing to do), or False when
+        preparing failed and is left to the action itself.
+        """
+        try:
+            return planned.action(planned.amount)
+        except (WebDriverException, RuntimeError):
+            logger.warning(
+                "Could not prepare %s ahead of time", planned.name, exc_info=True
+            )
+            return False
+
+    def check_memory(self, label: str, boundary: bool) -> bool:
+        """Sample browser memory at a safe point and recycle over the limits.
+
+        Above the hard limit the session is recycled right away, between
+        two actions; above the soft limit only at a cycle ``boundary``.
+        Returns whether the session was recycled.
+        """
+        rss = self.watchdog.sample(self.sessions.session, label)
+        if rss is None:
+            return False
+        self.metrics.set('instabot_browser_rss_bytes', rss)
+        settings = self.config.memory
+        mib = rss / 2**20
+        if mib >= settings.hard_limit_mb:
+            reason = f"RSS {mib:.0f} MiB over hard limit {settings.hard_limit_mb} MiB"
+        elif mib >= settings.soft_limit_mb and boundary:
+            reason = f"RSS {mib:.0f} MiB over soft limit {settings.soft_limit_mb} MiB"
+        else:
+            return False
+        self.sessions.recycle(reason)
+        self.session = None
+        return True
 
     def get_targets(self, type_: str, count: int) -> List[str]:
-        sources = {
-            'hashtags': [tag for tags in self.config.hashtags.values() for tag in tags],
-            'accounts': self.config.target_accounts,
-            'locations': self.config.locations,
-        }
-        logging.info(f"Getting {count} {type_} targets")
-        return random.sample(sources[type_], min(count, len(sources[type_])))
+        targets_logger.info("Getting %s %s targets", count, type_)
+        return self.target_index.sample(type_, count, self.rng)
 
-    def _get_actions(self, session: InstaPy) -> List[Callable]:
-        logging.info("Getting list of actions for current session")
+    def _get_actions(self, session: 'InstaPy') -> List[Callable]:
+        logger.info("Getting list of actions for current session")
         settings = self.get_session_settings()
-        logging.debug(f"Session settings: {settings}")
+        logger.debug("Session settings: %s", settings)
 
-        def interact_feed():
-            logging.info("Setting up feed interaction")
+        # Each action prepares its inputs and returns the browser call to
+        # make, or None when there is nothing to do, so the preparation can
+        # run during the pause before it. Preparing never navigates: anything
+        # that loads a page belongs in the returned call.
+        def interact_feed(amount: int) -> Optional[Callable]:
+            logger.info("Setting up feed interaction")
             session.set_do_like(enabled=True, percentage=70)
-            session.set_do_comment(enabled=True, percentage=20)
-            amount = min(
-                random.randint(5, 15),
-                self.config.max_daily_interactions - self.daily_interactions,
-            )
-            logging.info(f"Interacting with feed, amount: {amount}")
-            session.like_by_feed(
-                amount=amount,
-                randomize=True,
-                unfollow=False,
-                interact=True,
-            )
+            session.set_do_comment(enabled=True, percentage=COMMENT_PERCENTAGE)
+
+            def run():
+                logger.info("Interacting with feed, amount: %s", amount)
+                session.like_by_feed(
+                    amount=amount,
+                    randomize=True,
+                    unfollow=False,
+                    interact=True,
+                )
+
+            return run
 
-        def engage_location():
-            logging.info("Setting up location engagement")
+        def engage_location(amount: int) -> Optional[Callable]:
+            logger.info("Setting up location engagement")
             locations = self.get_targets('locations', 2)
             if not locations:
-                logging.warning("No locations available for engagement")
-                return
-            logging.debug(f"Selected locations: {locations}")
-            amount = min(
-                random.randint(4, 8),
-                self.config.max_daily_interactions - self.daily_interactions,
-            )
-            skip_top = random.choice([True, False])
-            logging.info(
-                f"Engaging with locations, amount: {amount}, skip_top: {skip_top}"
-            )
-            session.like_by_locations(
-                locations=locations,
-                amount=amount,
-                skip_top_posts=skip_top,
-            )
+                logger.warning("No locations available for engagement")
+                return None
+            logger.debug("Selected locations: %s", locations)
+            skip_top = self.rng.choice([True, False])
+
+            def run():
+                claimed = self.target_index.claim('locations', locations)
+                if not claimed:
+                    logger.warning("All selected locations are cooling down")
+                    return
+                logger.info(
+                    "Engaging with locations, amount: %s, skip_top: %s",
+                    amount,
+                    skip_top,
+                )
+                session.like_by_locations(
+                    locations=claimed,
+                    amount=amount,
+                    skip_top_posts=skip_top,
+                )
 
-        def engage_hashtags():
-            logging.info("Setting up hashtag engagement")
+            return run
+
+        def engage_hashtags(amount: int) -> Optional[Callable]:
+            logger.info("Setting up hashtag engagement")
             hashtags = self.get_targets('hashtags', 3)
             if not hashtags:
-                logging.warning("No hashtags available for engagement")
-                return
-            logging.debug(f"Selected hashtags: {hashtags}")
-            amount = min(
-                random.randint(5, 10),
-                self.config.max_daily_interactions - self.daily_interactions,
-            )
-            logging.info(f"Engaging with hashtags, amount: {amount}")
-            session.like_by_tags(
-                tags=hashtags,
-                amount=amount,
-                interact=True,
-                randomize=True,
-            )
+                logger.warning("No hashtags available for engagement")
+                return None
+            logger.debug("Selected hashtags: %s", hashtags)
+
+            def run():
+                claimed = self.target_index.claim('hashtags', hashtags)
+                if not claimed:
+                    logger.warning("All selected hashtags are cooling down")
+                    return
+                logger.info("Engaging with hashtags, amount: %s", amount)
+                session.like_by_tags(
+                    tags=claimed,
+                    amount=amount,
+                    interact=True,
+                    randomize=True,
+                )
+
+            return run
 
-        def engage_users():
-            logging.info("Setting up user engagement")
+        def engage_users(amount: int) -> Optional[Callable]:
+            logger.info("Setting up user engagement")
             accounts = self.get_targets('accounts', 2)
             if not accounts:
-                logging.warning("No accounts available for engagement")
-                return
-            logging.debug(f"Selected accounts: {accounts}")
-            amount = min(
-                random.randint(5, 8),
-                self.config.max_daily_interactions - self.daily_interactions,
-            )
-            delay = random.randint(60, 120)
-            logging.info(f"Engaging with users, amount: {amount}, delay: {delay}")
-            session.follow_user_followers(
-                usernames=accounts,
-                amount=amount,
-                randomize=True,
-                interact=True,
-                sleep_delay=delay,
-            )
+                logger.warning("No accounts available for engagement")
+                return None
+            logger.debug("Selected accounts: %s", accounts)
+            delay = self.rng.randint(60, 120)
 
-        def unfollow():
-            logging.info("Setting up unfollow action")
-            amount = min(
-                random.randint(10, 15),
-                self.config.max_daily_interactions - self.daily_interactions,
-            )
-            non_followers = random.choice([True, False])
-            delay = random.randint(450, 600)
-            logging.info(
-                f"Unfollowing users, amount: {amount}, "
-                f"non_followers: {non_followers}, "
-                f"delay: {delay}"
-            )
-            session.unfollow_users(
-                amount=amount,
-                nonFollowers=non_followers,
-                style="RANDOM",
-                unfollow_after=48 * 60 * 60,
-                sleep_delay=delay,
+            def run():
+                claimed = self.target_index.claim('accounts', accounts)
+                if not claimed:
+                    logger.warning("All selected accounts are cooling down")
+                    return
+                logger.info("Engaging with users, amount: %s, delay: %s", amount, delay)
+                session.follow_user_followers(
+                    usernames=claimed,
+                    amount=amount,
+                    randomize=True,
+                    interact=True,
+                    sleep_delay=delay,
+                )
+
+            return run
+
+        def unfollow(amount: int) -> Optional[Callable]:
+            logger.info("Setting up unfollow action")
+            non_followers = self.rng.choice([True, False])
+            delay = self.rng.randint(450, 600)
+            logger.info(
+                "Unfollowing users, amount: %s, non_followers: %s, delay: %s",
+                amount,
+                non_followers,
+                delay,
             )
+            if not any(self.ledger.follow_counts().values()):
+                # Nothing recorded yet: let InstaPy walk the following list.
+                return lambda: session.unfollow_users(
+                    amount=amount,
+                    nonFollowers=non_followers,
+                    style="RANDOM",
+                    unfollow_after=UNFOLLOW_AFTER,
+                    sleep_delay=delay,
+                )
+
+            candidates = self.unfollow_candidates(amount, non_followers)
+            if not candidates:
+                logger.info("No followed accounts are due for unfollowing")
+                return None
+            logger.debug("Unfollow candidates: %s", candidates)
+
+            def run():
+                selected = candidates
+                if non_followers:
+                    # Visits profile pages, so it is left out of the setup.
+                    selected = self.confirm_non_followers(session, candidates, amount)
+                    if not selected:
+                        logger.info("All unfollow candidates follow back")
+                        return
+                session.unfollow_users(
+                    amount=amount,
+                    custom_list_enabled=True,
+                    custom_list=selected,
+                    custom_list_param="all",
+                    style="RANDOM",
+                    unfollow_after=UNFOLLOW_AFTER,
+                    sleep_delay=delay,
+                )
+                self.ledger.unfollow_attempted(selected)
+
+            return run
 
         actions = [interact_feed]
-        logging.debug("Added base action: interact_feed")
+        logger.debug("Added base action: interact_feed")
 
         remaining_interactions = (
             self.config.max_daily_interactions - self.daily_interactions
         )
-        logging.info(f"Remaining interactions: {remaining_interactions}")
+        logger.info("Remaining interactions: %s", remaining_interactions)
 
         if remaining_interactions <= 0:
-            logging.warning("No remaining interactions available")
+            logger.warning("No remaining interactions available")
             return []
 
         if settings['mode'] == "active":
-            logging.info("Adding active mode actions")
+            logger.info("Adding active mode actions")
             actions.extend([engage_location, engage_hashtags, engage_users])
         elif settings['mode'] == "normal":
-            logging.info("Adding normal mode actions")
+            logger.info("Adding normal mode actions")
             actions.extend([engage_hashtags, engage_users])
 
-        current_hour = datetime.now().hour
+        current_hour = self.clock.now().hour
         if current_hour in [10, 14, 18, 21]:
-            logging.info(f"Adding unfollow action for hour {current_hour}")
+            logger.info("Adding unfollow action for hour %s", current_hour)
             actions.append(unfollow)
 
-        logging.info(f"Final action list contains {len(actions)} actions")
+        logger.info("Final action list contains %s actions", len(actions))
         return actions
 
     def get_break_duration(self) -> Optional[int]:
-        current = datetime.now().time()
-        breaks_config = self.config.breaks
-
-        lunch_end = (
-            datetime.combine(datetime.today(), self.breaks['lunch'])
-            + timedelta(minutes=random.randint(30, 60))
-        ).time()
-        if self.breaks['lunch'] <= current <= lunch_end:
-            logging.info("Taking a lunch break")
-            return random.randint(
-                breaks_config['lunch']['duration']['min'],
-                breaks_config['lunch']['duration']['max'],
-            )
-
-        for break_time in self.breaks['bathroom']:
-            break_end = (
-                datetime.combine(datetime.today(), break_time) + timedelta(minutes=10)
-            ).time()
-            if break_time <= current <= break_end:
-                logging.info("Taking a bathroom break")
-                return random.randint(
-                    breaks_config['bathroom']['duration']['min'],
-                    breaks_config['bathroom']['duration']['max'],
-                )
-        return None
+        break_kind = self.schedule.break_at(self.clock.now())
+        if break_kind is None:
+            return None
 
-    def get_session_settings(self) -> Dict:
-        current_hour = datetime.now().hour
-        if 22 <= current_hour or current_hour < 6:
-            mode = "sleepy"
-        elif current_hour in [12, 13, 19, 20, 21]:
-            mode = "active"
-        else:
-            mode = "normal"
+        schedule_logger.info("Taking a %s break", break_kind)
+        return self.rng.randint(*self.config.breaks.duration(break_kind))
 
-        limits = self.config.hourly_limits[mode]
-        if self.weekend:
-            limits = {k: int(v * 1.5) for k, v in limits.items()}
+    def get_session_settings(self) -> Dict:
+        mode = SESSION_MODES[self.clock.now().hour]
+        limits = self.config.limits_for(mode, self.weekend)
 
-        logging.info(f"Running in {mode} mode with limits: {limits}")
+        schedule_logger.info("Running in %s mode with limits: %s", mode, limits)
         return {'mode': mode, 'limits': limits}
 
-    def init_session(self) -> InstaPy:
-        session = InstaPy(
-            username=self.config.username,
-            password=self.config.password,
-            headless_browser=True,
-            geckodriver_path=GeckoDriverManager().install(),
-            want_check_browser=False,
-            disable_image_load=True,
-            page_delay=10,
-            bypass_security_challenge_using="email",
-        )
-
-        settings = self.get_session_settings()
-        limits = settings['limits']
-
+    def apply_quota_supervisor(self, session: 'InstaPy', limits: HourlyLimits):
         session.set_quota_supervisor(
             enabled=True,
-            peak_follows_hourly=limits["follows"],
-            peak_follows_daily=limits["follows"] * 24,
-            peak_unfollows_hourly=limits["unfollows"],
-            peak_unfollows_daily=limits["unfollows"] * 24,
-            peak_likes_hourly=limits["likes"],
-            peak_likes_daily=limits["likes"] * 24,
-            peak_comments_hourly=limits["comments"],
-            peak_comments_daily=limits["comments"] * 24,
+            peak_follows_hourly=limits.follows,
+            peak_follows_daily=limits.follows * 24,
+            peak_unfollows_hourly=limits.unfollows,
+            peak_unfollows_daily=limits.unfollows * 24,
+            peak_likes_hourly=limits.likes,
+            peak_likes_daily=limits.likes * 24,
+            peak_comments_hourly=limits.comments,
+            peak_comments_daily=limits.comments * 24,
             sleep_after=["follows", "unfollows", "likes", "comments"],
         )
 
-        bounds = self.config.relationship_bounds
+    def apply_relationship_bounds(self, session: 'InstaPy', bounds: RelationshipBounds):
         session.set_relationship_bounds(
             enabled=True,
-            max_followers=bounds['max_followers'],
-            min_followers=bounds['min_followers'],
-            min_following=bounds['min_following'],
-            min_posts=bounds['min_posts'],
-            max_following=bounds['max_following'],
-            max_posts=bounds['max_posts'],
+            max_followers=bounds.max_followers,
+            min_followers=bounds.min_followers,
+            min_following=bounds.min_following,
+            min_posts=bounds.min_posts,
+            max_following=bounds.max_following,
+            max_posts=bounds.max_posts,
+        )
+
+    def init_session(self, settings: Optional[Dict] = None) -> 'InstaPy':
+        session = self.backend.create_session(
+            username=self.config.username,
+            password=self.config.password,
+            headless_browser=True,
+            want_check_browser=False,
+            disable_image_load=True,
+            page_delay=self.config.waits.max_wait,
+            bypass_security_challenge_using="email",
         )
+        subscribe = getattr(session, 'subscribe', None)
+        if subscribe is not None:
+            # The worker's own hooks report through it.
+            subscribe('metric', self._on_worker_metric)
+            subscribe('waits', self.waits.absorb)
+            # A standby launched before a reload still has the old settings.
+            session.run(configure_page_waits, self.config.waits)
+
+        settings = settings or self.get_session_settings()
+        self.apply_quota_supervisor(session, settings['limits'])
+        self.apply_relationship_bounds(session, self.config.relationship_bounds)
 
         session.set_skip_users(
             skip_private=True, skip_no_profile_pic=True, skip_business=True
         )
 
         session.set_user_interact(
-            amount=random.randint(3, 6), randomize=True, percentage=70
+            amount=self.rng.randint(3, 6), randomize=True, percentage=70
         )
+        if self.profile_cache is not None:
+            self.profile_cache.install(session)
+        self.waits.install(session)
+        self._watch_follows(session)
 
-        logging.info(f"Session initialized with settings: {settings}")
+        session_logger.info("Session initialized with settings: %s", settings)
         return session
 
-    def run(self):
-        logging.info("Starting bot run loop")
-        retry_count = 0
-        max_retries = 3
+    def _on_worker_metric(self, op: str, name: str, value: float, labels: Dict):
+        getattr(self.metrics, op)(name, value, **labels)
 
-        while True:
-            try:
-                if self.daily_interactions >= self.config.max_daily_interactions:
-                    logging.warning("Daily interaction limit reached")
-                    logging.info("Sleeping for 24 hours")
-                    time_module.sleep(24 * 3600)
-                    self.daily_interactions = 0
-                    logging.info("Reset daily interactions counter")
-                    continue
+    def _watch_follows(self, session: 'InstaPy'):
+        """Record follows and unfollows reported by InstaPy's event hooks."""
+        subscribe = getattr(session, 'subscribe', None)
+        if subscribe is not None:
+            # A worker session relays the hooks fired in its own process.
+            subscribe('followed', self._on_followed)
+            subscribe('unfollowed', self._on_unfollowed)
+            return
+        event = sys.modules.get('instapy.event')
+        if event is None or self._follow_callbacks:
+            return
+        self._follow_callbacks = {
+            'followed': self._on_followed,
+            'unfollowed': self._on_unfollowed,
+        }
+        for name, callback in self._follow_callbacks.items():
+            event.Event().add_callback(name, callback)
 
-                if not self.is_active_hour():
-                    sleep_time = random.randint(1800, 3600)
-                    logging.info(
-                        f"Not active hour, sleeping for {sleep_time / 60:.1f} minutes"
-                    )
-                    time_module.sleep(sleep_time)
-                    continue
+    def _unwatch_follows(self):
+        event = sys.modules.get('instapy.event')
+        if event is None:
+            return
+        for name, callback in self._follow_callbacks.items():
+            callbacks = event.Event.callbacks.get(name, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+        self._follow_callbacks = {}
 
-                break_time = self.get_break_duration()
-                if break_time:
-                    logging.info(f"Taking a break for {break_time / 60:.1f} minutes")
-                    time_module.sleep(break_time)
-                    continue
+    def _on_followed(self, username: str):
+        self.ledger.record_follow(self.clock.now(), username)
 
-                logging.info("Initializing new session")
-                self.session = self.init_session()
+    def _on_unfollowed(self, username: str):
+        self.ledger.record_unfollow(self.clock.now(), username)
 
-                with smart_run(self.session):
-                    cycles = random.randint(2, 4)
-                    logging.info(f"Running {cycles} cycles")
+    def follows_back(self, session: 'InstaPy', username: str) -> Optional[bool]:
+        run = getattr(session, 'run', None)
+        if run is not None:
+            return run(follows_viewer, username)
+        return follows_viewer(session, username)
 
-                    for cycle_num in range(cycles):
-                        logging.info(f"Starting cycle {cycle_num + 1}/{cycles}")
-                        self.execute_cycle(self.session)
-                        sleep_time = random.randint(180, 600)
-                        logging.info(
-                            f"Sleeping for {sleep_time / 60:.1f} minutes between cycles"
-                        )
-                        time_module.sleep(sleep_time)
+    def standby_ready(self) -> bool:
+        ready = getattr(self.backend, 'standby_ready', None)
+        return ready is not None and ready()
+
+    def unfollow_candidates(self, amount: int, non_followers: bool) -> List[str]:
+        """Pick accounts to unfollow from the follow ledger, without the browser.
+
+        For ``non_followers`` up to three times ``amount`` are returned, as
+        some may turn out to follow back; see :meth:`confirm_non_followers`.
+        """
+        before = self.clock.now() - timedelta(seconds=UNFOLLOW_AFTER)
+        if not non_followers:
+            return self.ledger.unfollow_candidates(before, amount)
+        return self.ledger.unfollow_candidates(before, amount * 3, non_followers=True)
+
+    def confirm_non_followers(
+        self, session: 'InstaPy', candidates: Sequence[str], amount: int
+    ) -> List[str]:
+        """The first ``amount`` candidates that still do not follow back.
 
-                    interaction_increment = random.randint(5, 15)
-                    self.daily_interactions += interaction_increment
-                    logging.info(
-                        f"Incremented daily interactions by {interaction_increment}"
+        Only the candidates themselves are visited; the answer is stored so
+        followers are never checked twice.
+        """
+        selected = []
+        for username in candidates:
+            followed_back = self.follows_back(session, username)
+            if followed_back is None:
+                continue
+            self.ledger.mark_followed_back(username, followed_back)
+            if not followed_back:
+                selected.append(username)
+                if len(selected) == amount:
+                    break
+        return selected
+
+    def idle(self, seconds: float):
+        """Sleep between sessions, closing the browser for long idle periods."""
+        if seconds > self.sessions.max_idle:
+            self.sessions.close()
+        self.clock.sleep(seconds)
+
+    def run(self, until: Optional[datetime] = None):
+        logger.info("Starting bot run loop")
+        self.start_metrics()
+        try:
+            while until is None or self.clock.now() < until:
+                self.idle(self.step())
+        except Interrupted:
+            logger.info("Run loop interrupted")
+        finally:
+            self.close()
+
+    def close(self):
+        """End the browser session and persist everything still buffered."""
+        self.sessions.close()
+        self.session = None
+        close_backend = getattr(self.backend, 'close', None)
+        if close_backend is not None:
+            close_backend()
+        self._unwatch_follows()
+        self.stop_metrics()
+        self.ledger.flush()
+        if self.decision_log is not None:
+            self.decision_log.close()
+
+    def step(self) -> float:
+        """Run one iteration of the bot loop and return how long to idle after it."""
+        try:
+            self.reload_config()
+            now = self.clock.now()
+            self.daily_interactions = self.ledger.interactions_today(now)
+            if self.daily_interactions >= self.config.max_daily_interactions:
+                logger.warning("Daily interaction limit reached")
+                tomorrow = (now + timedelta(days=1)).replace(
+                    hour=0, minute=0, second=0, microsecond=0
+                )
+                sleep_time = (tomorrow - now).total_seconds()
+                logger.info("Sleeping for %.1f hours until midnight", sleep_time / 3600)
+                return sleep_time
+
+            if not self.is_active_hour():
+                sleep_time = self.schedule.seconds_until_active(self.clock.now())
+                logger.info(
+                    "Not active hour, sleeping for %.1f minutes", sleep_time / 60
+                )
+                return sleep_time
+
+            break_time = self.get_break_duration()
+            if break_time:
+                logger.info("Taking a break for %.1f minutes", break_time / 60)
+                return break_time
+
+            logger.info("Initializing new session")
+            self.session = self.sessions.acquire(self.get_session_settings())
+
+            session_started = self.clock.monotonic()
+            cycles = self.rng.randint(2, 4)
+            logger.info("Running %s cycles", cycles)
+
+            for cycle_num in range(cycles):
+                if not self.is_active_hour() or self.schedule.in_break(
+                    self.clock.now()
+                ):
+                    logger.info("Schedule window closed, ending session early")
+                    break
+                if self.session is None:
+                    # Recycled for memory at the end of the previous cycle, or
+                    # lost with a standby worker ready to take over.
+                    self.session = self.sessions.acquire(self.get_session_settings())
+                logger.info("Starting cycle %s/%s", cycle_num + 1, cycles)
+                if not self.execute_cycle(self.session):
+                    break
+                if self.session is None and not (
+                    self.sessions.recycled or self.standby_ready()
+                ):
+                    break
+                if self.session is not None:
+                    self.check_memory('cycle', boundary=True)
+                sleep_time = self.rng.randint(180, 600)
+                logger.info("Sleeping for %.1f minutes between cycles", sleep_time / 60)
+                self.clock.sleep(sleep_time)
+
+            self.metrics.observe(
+                'instabot_session_duration_seconds',
+                self.clock.monotonic() - session_started,
+            )
+
+            self.ledger.flush()
+            logger.info("Total daily interactions: %s", self.daily_interactions)
+            saved, misses = self.waits.session_summary()
+            if misses:
+                logger.info(
+                    "Adaptive waits saved %.0fs over %s missing-element probes"
+                    " (implicit wait %.1fs, page load timeout %.0fs)",
+                    saved,
+                    misses,
+                    self.waits.implicit,
+                    self.waits.page_load,
+                )
+
+            self.retry_count = 0
+            if self.session is None and not self.sessions.recycled:
+                if self.standby_ready():
+                    sleep_time = self.config.worker.takeover_delay
+                    logger.info(
+                        "Session lost, standby browser worker takes over in %.0f"
+                        " seconds",
+                        sleep_time,
                     )
-                    logging.info(f"Total daily interactions: {self.daily_interactions}")
+                    return sleep_time
+                sleep_time = self.session_backoff.next_delay(self.rng)
+                logger.info(
+                    "Session lost, starting a new one in %.1f minutes", sleep_time / 60
+                )
+                return sleep_time
+            self.session_backoff.reset()
+            sleep_time = self.rng.randint(900, 1800)
+            logger.info(
+                "Sleeping for %.1f minutes after successful session", sleep_time / 60
+            )
+            return sleep_time
+
+        except (WebDriverException, RuntimeError) as e:
+            kind = classify_error(e)
+            logger.error("%s error encountered: %s", kind.title(), e, exc_info=True)
+            if kind == BROWSER:
+                self.sessions.discard()
+                self.session = None
+            self.retry_count += 1
+            max_retries = self.config.recovery.max_retries
+            logger.warning("Retry attempt %s/%s", self.retry_count, max_retries)
+            if self.retry_count >= max_retries:
+                logger.critical("Maximum retries reached")
+                raise RuntimeError("Maximum retries reached") from e
+            if kind == BROWSER and self.standby_ready():
+                sleep_time = self.config.worker.takeover_delay
+            else:
+                sleep_time = self.session_backoff.next_delay(self.rng)
+            logger.info("Sleeping for %.1f minutes before retry", sleep_time / 60)
+            self.metrics.inc(
+                'instabot_recovery_sleep_seconds_total',
+                sleep_time,
+                reason=type(e).__name__,
+            )
+            return sleep_time
+
+
+class Orchestrator:
+    """asyncio front end that owns timing, signals and auxiliary services.
+
+    Every blocking InstaPy/Selenium call, including each :meth:`step` of
+    the bot, runs on one dedicated browser thread, so the driver is only
+    ever touched from that thread while the event loop stays free to sleep,
+    poll the config and export metrics. SIGTERM and SIGINT wake both sides
+    and the browser gets ``shutdown_timeout`` seconds to close cleanly.
+    """
+
+    def __init__(self, bot: InstagramBot):
+        self.bot = bot
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='browser')
+        self.stop: Optional[asyncio.Event] = None
+        self.tasks: List[asyncio.Task] = []
+
+    async def call(self, func: Callable, *args):
+        """Run ``func`` on the browser thread."""
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, func, *args
+        )
+
+    async def call_until_stopped(self, func: Callable, *args):
+        """Like :meth:`call`, but raise :class:`Interrupted` as soon as a stop
+        is requested instead of waiting for a blocked browser call."""
+        future = asyncio.ensure_future(self.call(func, *args))
+        stopped = asyncio.ensure_future(self.stop.wait())
+        await asyncio.wait({future, stopped}, return_when=asyncio.FIRST_COMPLETED)
+        stopped.cancel()
+        if not future.done():
+            raise Interrupted()
+        return future.result()
+
+    def request_stop(self, reason: str):
+        if not self.stop.is_set():
+            logger.info("Shutdown requested (%s)", reason)
+        self.stop.set()
+        self.bot.clock.interrupt()
 
-                retry_count = 0
-                time_sleep = random.randint(900, 1800)
-                logging.info(
-                    f"Sleeping for {time_sleep / 60:.1f} minutes after successful session"
+    async def every(self, interval: Callable[[], float], func: Callable):
+        """Call ``func`` on the browser thread every ``interval()`` wall seconds."""
+        while not await Clock.wait(self.bot.clock, interval(), self.stop):
+            try:
+                await self.call(func)
+            except Interrupted:
+                return
+            except Exception:
+                logger.exception("Periodic task %s failed", func.__name__)
+
+    async def run(self, until: Optional[datetime] = None):
+        loop = asyncio.get_running_loop()
+        self.stop = asyncio.Event()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, self.request_stop, sig.name)
+        loop.add_signal_handler(signal.SIGUSR1, self.bot.profiler.toggle)
+
+        bot = self.bot
+        bot.start_metrics()
+        self.tasks = [
+            loop.create_task(
+                self.every(lambda: bot.config.reload.interval, bot.reload_config)
+            ),
+            loop.create_task(
+                self.every(
+                    lambda: bot.config.runtime.export_interval, bot.export_metrics
                 )
-                time_module.sleep(time_sleep)
-
-            except (WebDriverException, TimeoutException) as e:
-                logging.error(f"Browser error encountered: {str(e)}", exc_info=True)
-                retry_count += 1
-                logging.warning(f"Retry attempt {retry_count}/{max_retries}")
-                if retry_count >= max_retries:
-                    error_msg = "Maximum retries reached"
-                    logging.critical(error_msg)
-                    raise RuntimeError(error_msg)
-                logging.info("Sleeping for 15 minutes before retry")
-                time_module.sleep(900)
-            except RuntimeError as e:
-                logging.error(f"Runtime error encountered: {str(e)}", exc_info=True)
-                retry_count += 1
-                logging.warning(f"Retry attempt {retry_count}/{max_retries}")
-                if retry_count >= max_retries:
-                    logging.critical("Maximum retries reached")
-                    raise
-                logging.info("Sleeping for 5 minutes before retry")
-                time_module.sleep(300)
+            ),
+        ]
+        logger.info("Starting bot orchestrator")
+        try:
+            while not self.stop.is_set() and (until is None or bot.clock.now() < until):
+                seconds = await self.call_until_stopped(bot.step)
+                if seconds > bot.sessions.max_idle:
+                    await self.call(bot.sessions.close)
+                if await bot.clock.wait(seconds, self.stop):
+                    break
+        except Interrupted:
+            logger.info("Bot step interrupted")
+        finally:
+            await self.shutdown()
+            for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGUSR1):
+                loop.remove_signal_handler(sig)
+
+    async def shutdown(self):
+        """Close the browser within ``runtime.shutdown_timeout`` seconds."""
+        self.stop.set()
+        self.bot.clock.interrupt()
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+        timeout = self.bot.config.runtime.shutdown_timeout
+        try:
+            await asyncio.wait_for(self.call(self.bot.close), timeout)
+            logger.info("Shutdown complete")
+        except asyncio.TimeoutError:
+            logger.error(
+                "Browser thread did not finish within %ss, quitting the driver", timeout
+            )
+            self.bot.sessions.discard()
+            self.bot.ledger.flush()
+        finally:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Log lines the report reads; everything else is skipped before decoding.
+REPORT_MARKERS = (
+    b'Executing action: ',
+    b'completed successfully',
+    b' error in ',
+    b'leeping for ',
+    b'break for ',
+    b'delay of ',
+    b'new one in ',
+    b'Started new session',
+)
+ACTION_START = re.compile(r'Executing action: (\w+)')
+ACTION_DONE = re.compile(r'Action (\w+) completed successfully')
+ACTION_ERROR = re.compile(r'\w+ error in (\w+) \((\w+)\)')
+SLEEP = re.compile(
+    r'(?:[Ss]leeping for|break for|delay of|new one in) ([\d.]+) (seconds|minutes|hours)'
+)
+SLEEP_UNITS = {'seconds': 1, 'minutes': 60, 'hours': 3600}
+# (message fragment, reason) pairs in match order.
+SLEEP_REASONS = (
+    ('between actions', 'pause'),
+    ('delay of', 'pause'),
+    ('between cycles', 'cycle'),
+    ('successful session', 'session'),
+    ('break', 'break'),
+    ('Not active hour', 'night'),
+    ('midnight', 'daily_limit'),
+)
+
+
+def log_files(path: str) -> List[str]:
+    """``path`` and its rotations (``path.N`` or ``path.N.gz``), oldest first."""
+    directory = os.path.dirname(path) or '.'
+    base = os.path.basename(path)
+    pattern = re.compile(re.escape(base) + r'\.(\d+)(\.gz)?$')
+    rotated = []
+    for name in os.listdir(directory):
+        match = pattern.match(name)
+        if match:
+            rotated.append((int(match.group(1)), os.path.join(directory, name)))
+    files = [name for _, name in sorted(rotated, reverse=True)]
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+
+def _marker_lines(buffer, marker: bytes) -> Iterator[Tuple[int, int]]:
+    pos = buffer.find(marker)
+    while pos >= 0:
+        start = buffer.rfind(b'\n', 0, pos) + 1
+        end = buffer.find(b'\n', pos)
+        if end < 0:
+            end = len(buffer)
+        yield start, end
+        pos = buffer.find(marker, end)
+
+
+def _marked_lines(buffer) -> Iterator[bytes]:
+    """Lines of ``buffer`` holding a report marker, in file order.
+
+    Each marker is located with ``find`` (a C-level scan that is far faster
+    than one regex alternation) and the hits are merged by position.
+    """
+    last = -1
+    for start, end in heapq.merge(
+        *(_marker_lines(buffer, marker) for marker in REPORT_MARKERS)
+    ):
+        if start != last:
+            last = start
+            yield buffer[start:end]
+
+
+def read_marked_lines(path: str, chunk_size: int = 1 << 20) -> Iterator[bytes]:
+    """Yield the report's lines from a plain or gzipped log in constant memory.
+
+    Plain files are memory-mapped and scanned in place; gzipped rotations
+    are decompressed in ``chunk_size`` blocks cut at line boundaries.
+    """
+    if path.endswith('.gz'):
+        with gzip.open(path, 'rb') as f:
+            tail = b''
+            while chunk := f.read(chunk_size):
+                chunk = tail + chunk
+                cut = chunk.rfind(b'\n') + 1
+                yield from _marked_lines(chunk[:cut])
+                tail = chunk[cut:]
+            yield from _marked_lines(tail)
+        return
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            yield from _marked_lines(mapped)
+
+
+def parse_log(paths: Sequence[str]) -> Iterator[Tuple[datetime, str]]:
+    """Yield ``(timestamp, message)`` for the report's lines in text or JSON logs."""
+    for path in paths:
+        for line in read_marked_lines(path):
+            text = line.decode('utf-8', 'replace').rstrip('\r')
+            try:
+                if text.startswith('{'):
+                    entry = json.loads(text)
+                    yield datetime.fromisoformat(entry['ts']), entry['msg']
+                else:
+                    ts, _, _, message = text.split(' | ', 3)
+                    yield datetime.fromisoformat(ts), message
+            except (ValueError, KeyError):
+                # Traceback lines and other continuation text.
+                continue
+
+
+class LogReport:
+    """Aggregates :func:`parse_log` output in constant memory.
+
+    Action durations run from "Executing action" to its "completed
+    successfully" or error line; sleeps are read from every "Sleeping for",
+    break and delay message.
+    """
+
+    def __init__(self):
+        self.actions: Dict[str, Histogram] = {}
+        self.errors: Counter = Counter()
+        self.action_errors: Counter = Counter()
+        self.sleep: Counter = Counter()
+        self.days: Dict[str, Counter] = {}
+        self.first: Optional[datetime] = None
+        self.last: Optional[datetime] = None
+        self._running: Optional[Tuple[str, datetime]] = None
+
+    def _day(self, moment: datetime) -> Counter:
+        return self.days.setdefault(moment.date().isoformat(), Counter())
+
+    def _finish(self, moment: datetime, name: str) -> Optional[float]:
+        if self._running is None or self._running[0] != name:
+            return None
+        duration = (moment - self._running[1]).total_seconds()
+        self._running = None
+        self.actions.setdefault(name, Histogram()).observe(duration)
+        day = self._day(moment)
+        day['actions'] += 1
+        day['work_s'] += duration
+        return duration
+
+    def feed(self, moment: datetime, message: str):
+        if self.first is None:
+            self.first = moment
+        self.last = moment
+
+        match = ACTION_START.search(message)
+        if match:
+            self._running = (match.group(1), moment)
+            return
+        match = ACTION_DONE.search(message)
+        if match:
+            self._finish(moment, match.group(1))
+            return
+        match = ACTION_ERROR.search(message)
+        if match:
+            name, exception = match.groups()
+            self._finish(moment, name)
+            self.errors[exception] += 1
+            self.action_errors[name] += 1
+            self._day(moment)['errors'] += 1
+            return
+        if 'Started new session' in message:
+            self._day(moment)['sessions'] += 1
+            return
+        match = SLEEP.search(message)
+        if match:
+            seconds = float(match.group(1)) * SLEEP_UNITS[match.group(2)]
+            reason = next(
+                (reason for text, reason in SLEEP_REASONS if text in message),
+                'recovery',
+            )
+            self.sleep[reason] += seconds
+            self._day(moment)['sleep_s'] += seconds
+
+    def as_dict(self) -> Dict:
+        total_actions = sum(h.count for h in self.actions.values())
+        span = (self.last - self.first).total_seconds() if self.first else 0.0
+        work = sum(h.sum for h in self.actions.values())
+        sleep = sum(self.sleep.values())
+        return {
+            'from': self.first.isoformat() if self.first else None,
+            'to': self.last.isoformat() if self.last else None,
+            'actions': {
+                name: {
+                    'count': h.count,
+                    'errors': self.action_errors[name],
+                    'mean_s': h.sum / h.count,
+                    'p50_s': h.quantile(0.5),
+                    'p95_s': h.quantile(0.95),
+                    'total_s': h.sum,
+                }
+                for name, h in sorted(self.actions.items())
+            },
+            'errors': {
+                exception: {
+                    'count': count,
+                    'rate': count / total_actions if total_actions else 0.0,
+                }
+                for exception, count in self.errors.most_common()
+            },
+            'time': {
+                'span_s': span,
+                'work_s': work,
+                'sleep_s': sleep,
+                'other_s': max(span - work - sleep, 0.0),
+                'sleep_by_reason_s': dict(self.sleep.most_common()),
+            },
+            'days': {
+                day: {
+                    'sessions': counts['sessions'],
+                    'actions': counts['actions'],
+                    'errors': counts['errors'],
+                    'work_h': counts['work_s'] / 3600,
+                    'sleep_h': counts['sleep_s'] / 3600,
+                }
+                for day, counts in sorted(self.days.items())
+            },
+        }
+
+    @staticmethod
+    def format(report: Dict) -> str:
+        lines = [f"Log from {report['from']} to {report['to']}", ""]
+        lines.append(
+            f"{'action':<18} {'count':>6} {'errors':>6} {'mean s':>8} "
+            f"{'p50 s':>8} {'p95 s':>8} {'total h':>8}"
+        )
+        for name, row in report['actions'].items():
+            lines.append(
+                f"{name:<18} {row['count']:>6} {row['errors']:>6} "
+                f"{row['mean_s']:>8.1f} {row['p50_s']:>8.1f} {row['p95_s']:>8.1f} "
+                f"{row['total_s'] / 3600:>8.2f}"
+            )
+        lines += ["", f"{'exception':<32} {'count':>6} {'rate':>7}"]
+        for exception, row in report['errors'].items():
+            lines.append(f"{exception:<32} {row['count']:>6} {row['rate']:>7.1%}")
+        time_spent = report['time']
+        span = time_spent['span_s'] or 1.0
+        lines += ["", f"{'time':<18} {'hours':>8} {'share':>7}"]
+        for label in ('work', 'sleep', 'other'):
+            seconds = time_spent[f'{label}_s']
+            lines.append(f"{label:<18} {seconds / 3600:>8.2f} {seconds / span:>7.1%}")
+        for reason, seconds in time_spent['sleep_by_reason_s'].items():
+            lines.append(
+                f"  sleep: {reason:<10} {seconds / 3600:>8.2f} {seconds / span:>7.1%}"
+            )
+        lines += [
+            "",
+            f"{'day':<12} {'sessions':>8} {'actions':>8} {'errors':>7} "
+            f"{'work h':>7} {'sleep h':>8}",
+        ]
+        for day, row in report['days'].items():
+            lines.append(
+                f"{day:<12} {row['sessions']:>8} {row['actions']:>8} "
+                f"{row['errors']:>7} {row['work_h']:>7.2f} {row['sleep_h']:>8.2f}"
+            )
+        return '\n'.join(lines)
+
+
+def report(path: str = 'instabot.log') -> Dict:
+    """Summarize ``path`` and its rotated files, see :class:`LogReport`."""
+    paths = log_files(path)
+    if not paths:
+        raise FileNotFoundError(f"No log files found for {path}")
+    summary = LogReport()
+    for moment, message in parse_log(paths):
+        summary.feed(moment, message)
+    return summary.as_dict()
+
+
+# Exception types recorded action failures are replayed as.
+REPLAY_FAILURES = {
+    exc.__name__: exc
+    for exc in (
+        WebDriverException,
+        TimeoutException,
+        NoSuchElementException,
+        StaleElementReferenceException,
+        RuntimeError,
+    )
+}
+# Recorded successes shorter than this returned before reaching the browser
+# (no targets left, for example), so the fake session never sees them.
+REPLAY_MIN_SECONDS = 1.0
+
+
+def replay(path: str, config_path: str = 'config.yaml') -> Dict:
+    """Re-drive a recorded run offline against :mod:`fake_instapy`.
+
+    Draws come from the decision log; every engagement call and login takes
+    the recorded duration (and failure) on a virtual clock, so a slow or failing
+    day is reproduced in seconds without a browser. The ledger lives in
+    memory, seeded with the interactions the run started with, and the
+    on-disk profile cache is left alone.
+    """
+    from fake_instapy import FakeBackend
+
+    header, rates, decisions, actions, logins = None, {}, [], [], []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            entry = json.loads(line)
+            if header is None:
+                header = entry
+            elif 'r' in entry:
+                decisions.append(entry)
+            elif 'a' in entry:
+                actions.append(entry)
+            elif 'login' in entry:
+                logins.append(entry['login'])
+            elif 'rates' in entry:
+                rates = entry['rates']
+    if header is None:
+        raise ValueError(f"Decision log {path} is empty")
+
+    script = []
+    for action in actions:
+        error = action['e']
+        if error == Interrupted.__name__:
+            continue
+        if error is None and action['d'] < REPLAY_MIN_SECONDS:
+            continue
+        failure = REPLAY_FAILURES.get(error, WebDriverException) if error else None
+        script.append((action['d'], failure, action['n']))
+    start = datetime.fromisoformat(header['start'])
+    end = start + timedelta(seconds=actions[-1]['t'] if actions else 0)
+
+    ledger = ActionLedger(':memory:')
+    if header['interactions']:
+        ledger.record(start, 'replay', 'success', header['interactions'], 0.0)
+    clock = VirtualClock(start)
+    backend = FakeBackend(
+        clock=clock, seed=header['seed'], script=script, logins=logins
+    )
+    rng = ReplayRandom(decisions, header['seed'])
+    bot = InstagramBot(
+        config_path,
+        clock=clock,
+        backend=backend,
+        rng=rng,
+        ledger=ledger,
+        profile_cache=False,
+    )
+    bot.planner.rates.update(rates)
+
+    replay_logger.info(
+        "Replaying %s decisions and %s actions from %s to %s",
+        len(decisions),
+        len(actions),
+        start,
+        end,
+    )
+    started = time_module.perf_counter()
+    try:
+        while clock.now() < end:
+            bot.idle(bot.step())
+    finally:
+        bot.close()
+    wall = time_module.perf_counter() - started
+
+    return {
+        'decisions': len(decisions),
+        'decisions_replayed': rng.replayed,
+        'diverged': rng.diverged,
+        'actions': len(actions),
+        'calls_replayed': len(script) - len(backend.script),
+        'simulated_s': (clock.now() - start).total_seconds(),
+        'wall_s': wall,
+        'interactions': ledger.interactions_between(start, clock.now())
+        - header['interactions'],
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description="Instagram engagement bot")
+    parser.add_argument('--config', default='config.yaml')
+    commands = parser.add_subparsers(dest='command')
+    commands.add_parser('run', help="run the bot (default)")
+    replay_parser = commands.add_parser(
+        'replay', help="re-drive a recorded run offline against a fake browser"
+    )
+    replay_parser.add_argument('log', help="decision log written by a previous run")
+    replay_parser.add_argument(
+        '--verbose', action='store_true', help="show the bot's INFO logging"
+    )
+    replay_parser.add_argument(
+        '--json', action='store_true', help="print results as JSON"
+    )
+    report_parser = commands.add_parser(
+        'report', help="summarize instabot.log and its rotated files"
+    )
+    report_parser.add_argument('log', nargs='?', default='instabot.log')
+    report_parser.add_argument(
+        '--json', action='store_true', help="print the report as JSON"
+    )
+    args = parser.parse_args(argv)
+
+    if args.command == 'report':
+        try:
+            summary = report(args.log)
+        except OSError as e:
+            sys.exit(f"report: {e}")
+        print(json.dumps(summary, indent=2) if args.json else LogReport.format(summary))
+        return
+
+    if args.command == 'replay':
+        setup_logging(
+            LoggingSettings(level='INFO' if args.verbose else 'WARNING', file='')
+        )
+        results = replay(args.log, args.config)
+        if args.json:
+            print(json.dumps(results, indent=2))
+            return
+        print(
+            f"replayed {results['decisions_replayed']}/{results['decisions']} "
+            f"decisions{' (diverged)' if results['diverged'] else ''} and "
+            f"{results['calls_replayed']}/{results['actions']} actions"
+        )
+        print(
+            f"{results['simulated_s'] / 3600:.1f}h simulated in "
+            f"{results['wall_s']:.2f}s wall, {results['interactions']} interactions"
+        )
+        return
+
+    setup_logging()
+    logger.info("Starting bot")
+    bot = InstagramBot(args.config)
+    setup_logging(bot.config.logging)
+    asyncio.run(Orchestrator(bot).run())
 
 
 if __name__ == "__main__":
-    logging.info("Starting bot")
-    bot = InstagramBot()
-    bot.run()
+    main()
@@ -0,0 +1,145 @@
+"""Offline benchmarks for the bot's scheduling and session loop.
+
+Runs entirely in-process against :mod:`fake_instapy` with a virtual clock,
+so no browser, network or real sleeping is involved::
+
+    python benchmarks.py
+    python benchmarks.py --cycles 200 --latency 0.001 --json
+"""
+
+import argparse
+import json
+import logging
+import random
+import time as time_module
+import timeit
+from datetime import datetime
+from typing import Callable, Dict, List
+
+from app import ActionLedger, Config, InstagramBot, VirtualClock, setup_logging
+from fake_instapy import FakeBackend
+
+# A weekday during the evening window in "active" mode, so every action
+# is eligible and no break or schedule transition interferes.
+BENCH_START = datetime(2026, 10, 19, 19, 0)
+
+
+def bench_bot(config_path: str, clock: VirtualClock, backend: FakeBackend):
+    """A bot with a fixed seed (which also skips the decision log), an
+    in-memory ledger and no profile cache, so nothing reads or writes the
+    production data files."""
+    return InstagramBot(
+        config_path,
+        clock=clock,
+        backend=backend,
+        rng=random.Random(1),
+        ledger=ActionLedger(':memory:'),
+        profile_cache=False,
+    )
+
+
+def micro(name: str, func: Callable, repeat: int) -> Dict:
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=number)) / number
+    return {'name': name, 'per_call_us': best * 1e6, 'calls_per_s': 1 / best}
+
+
+def run_micro(config_path: str, repeat: int) -> List[Dict]:
+    clock = VirtualClock(BENCH_START)
+    bot = bench_bot(config_path, clock, FakeBackend(clock=clock))
+    session = bot.init_session()
+    return [
+        micro('Config.__init__', lambda: Config(config_path), repeat),
+        micro('is_active_hour', bot.is_active_hour, repeat),
+        micro('get_break_duration', bot.get_break_duration, repeat),
+        micro('get_session_settings', bot.get_session_settings, repeat),
+        micro('_get_actions', lambda: bot._get_actions(session), repeat),
+    ]
+
+
+def run_macro(config_path: str, cycles: int, latency: float, real: bool) -> Dict:
+    clock = VirtualClock(BENCH_START)
+    backend = FakeBackend(latency=latency, clock=None if real else clock, seed=1)
+    bot = bench_bot(config_path, clock, backend)
+    # Keep the budget out of the way so every cycle runs its full action list.
+    bot.config.max_daily_interactions = 10**9
+
+    started = time_module.perf_counter()
+    session = bot.init_session()
+    with backend.smart_run(session):
+        for _ in range(cycles):
+            # Start every cycle at the same wall time, so the evening window
+            # never closes and each cycle plans its full action list.
+            clock._now = BENCH_START
+            bot.execute_cycle(session)
+    wall = time_module.perf_counter() - started
+
+    actions = sum(
+        count
+        for name, count in backend.calls.items()
+        if not name.startswith('set_') and name != 'login'
+    )
+    overhead = wall - (backend.latency_paid if real else 0.0)
+    return {
+        'cycles': cycles,
+        'actions': actions,
+        'wall_s': wall,
+        'simulated_s': clock.monotonic(),
+        'actions_per_s': actions / wall if wall else float('inf'),
+        'overhead_per_action_us': overhead / actions * 1e6 if actions else 0.0,
+        'interactions': session.liked_img + session.followed + session.unfollowed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--config', default='config.yaml')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--cycles', type=int, default=100)
+    parser.add_argument(
+        '--latency', type=float, default=0.0, help="fake per-call latency in seconds"
+    )
+    parser.add_argument(
+        '--real-latency',
+        action='store_true',
+        help="pay fake latency in wall time instead of virtual time",
+    )
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    parser.add_argument(
+        '--log', action='store_true', help="keep bot logging enabled while measuring"
+    )
+    args = parser.parse_args()
+
+    if args.log:
+        setup_logging()
+    else:
+        logging.disable(logging.CRITICAL)
+
+    results = {
+        'micro': run_micro(args.config, args.repeat),
+        'macro': run_macro(args.config, args.cycles, args.latency, args.real_latency),
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'benchmark':<24} {'per call (us)':>14} {'calls/s':>14}")
+    for row in results['micro']:
+        print(
+            f"{row['name']:<24} {row['per_call_us']:>14.2f} {row['calls_per_s']:>14.0f}"
+        )
+    macro = results['macro']
+    print()
+    print(
+        f"execute_cycle x{macro['cycles']}: {macro['actions']} actions "
+        f"in {macro['wall_s']:.3f}s wall ({macro['simulated_s'] / 3600:.1f}h simulated)"
+    )
+    print(f"throughput:        {macro['actions_per_s']:.0f} actions/s")
+    print(f"loop overhead:     {macro['overhead_per_action_us']:.1f} us/action")
+    print(f"interactions done: {macro['interactions']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,344 @@
+import logging
+import random
+import time as time_module
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+from selenium.common import TimeoutException, WebDriverException
+
+logger = logging.getLogger('instabot.fake')
+
+
+class FakeBrowser:
+    """Minimal stand-in for the Selenium driver held by an InstaPy session."""
+
+    def __init__(self):
+        self.alive = True
+        self.url = "https://www.instagram.com/"
+
+    @property
+    def current_url(self) -> str:
+        if not self.alive:
+            raise WebDriverException("Browser session is not running")
+        return self.url
+
+    def quit(self):
+        self.alive = False
+
+
+class FakeInstaPy:
+    """In-process stand-in for an ``InstaPy`` session.
+
+    Every engagement call pays the backend's configured latency, may raise
+    an injected failure and bumps the same counters InstaPy keeps
+    (``liked_img``, ``commented``, ``followed``, ``unfollowed``).
+    """
+
+    def __init__(
+        self,
+        backend: 'FakeBackend',
+        username: str = None,
+        password: str = None,
+        nogui: bool = False,
+        selenium_local_session: bool = True,
+        browser_profile_path: str = None,
+        page_delay: int = 25,
+        show_logs: bool = True,
+        headless_browser: bool = False,
+        proxy_username: str = None,
+        proxy_password: str = None,
+        proxy_address: str = None,
+        proxy_port: str = None,
+        disable_image_load: bool = False,
+        multi_logs: bool = True,
+        log_handler=None,
+        geckodriver_path: str = None,
+        split_db: bool = False,
+        bypass_security_challenge_using: str = 'email',
+        security_codes: int = 0,
+        want_check_browser: bool = True,
+        browser_executable_path: str = None,
+        geckodriver_log_level: str = 'info',
+    ):
+        self.backend = backend
+        self.username = username
+        self.page_delay = page_delay
+        self.headless_browser = headless_browser
+        self.settings: Dict[str, Dict] = {}
+        self.browser = FakeBrowser()
+        self.aborting = False
+        self.logged_in = False
+
+        self.liked_img = 0
+        self.commented = 0
+        self.followed = 0
+        self.unfollowed = 0
+        self.inap_img = 0
+
+    def _call(self, name: str, counter: str = 'liked_img') -> bool:
+        """Run one engagement call; True if it produced scripted interactions."""
+        self.backend.calls[name] = self.backend.calls.get(name, 0) + 1
+        delay, failure, interactions = self.backend.next_call(name)
+        self.backend.pay(delay)
+        if not self.browser.alive:
+            raise WebDriverException("Browser session is not running")
+        if failure is not None:
+            if failure is WebDriverException:
+                self.browser.quit()
+            raise failure(f"Injected failure in {name}")
+        if interactions is None:
+            return False
+        setattr(self, counter, getattr(self, counter) + interactions)
+        return True
+
+    def _setting(self, name: str, settings: Dict):
+        self.backend.calls[name] = self.backend.calls.get(name, 0) + 1
+        settings.pop('self')
+        self.settings[name] = settings
+        return self
+
+    # Parameters mirror InstaPy 0.6.16, so a wrong keyword fails offline too.
+    def set_quota_supervisor(
+        self,
+        enabled: bool = False,
+        sleep_after: list = None,
+        sleepyhead: bool = False,
+        stochastic_flow: bool = False,
+        notify_me: bool = False,
+        peak_likes_hourly: int = None,
+        peak_likes_daily: int = None,
+        peak_comments_hourly: int = None,
+        peak_comments_daily: int = None,
+        peak_follows_hourly: int = None,
+        peak_follows_daily: int = None,
+        peak_unfollows_hourly: int = None,
+        peak_unfollows_daily: int = None,
+        peak_server_calls_hourly: int = None,
+        peak_server_calls_daily: int = None,
+    ):
+        return self._setting('set_quota_supervisor', locals())
+
+    def set_relationship_bounds(
+        self,
+        enabled: bool = False,
+        potency_ratio: float = None,
+        delimit_by_numbers: bool = None,
+        min_posts: int = None,
+        max_posts: int = None,
+        max_followers: int = None,
+        max_following: int = None,
+        min_followers: int = None,
+        min_following: int = None,
+    ):
+        return self._setting('set_relationship_bounds', locals())
+
+    def set_skip_users(
+        self,
+        skip_private: bool = True,
+        private_percentage: int = 100,
+        skip_public: bool = False,
+        public_percentage: int = 100,
+        skip_no_profile_pic: bool = False,
+        no_profile_pic_percentage: int = 100,
+        skip_business: bool = False,
+        business_percentage: int = 100,
+        skip_business_categories: list = None,
+        dont_skip_business_categories: list = None,
+        skip_non_business: bool = False,
+        skip_bio_keyword: list = None,
+        mandatory_bio_keywords: list = None,
+    ):
+        return self._setting('set_skip_users', locals())
+
+    def set_user_interact(
+        self,
+        amount: int = 10,
+        percentage: int = 100,
+        randomize: bool = False,
+        media: str = None,
+    ):
+        return self._setting('set_user_interact', locals())
+
+    def set_do_like(self, enabled: bool = False, percentage: int = 0):
+        return self._setting('set_do_like', locals())
+
+    def set_do_comment(
+        self,
+        enabled: bool = False,
+        comment_liked_photo: bool = False,
+        percentage: int = 0,
+    ):
+        return self._setting('set_do_comment', locals())
+
+    def login(self):
+        self._call('login')
+        self.logged_in = True
+        return self
+
+    def end(self, threaded_session: bool = False):
+        self.browser.quit()
+        self.logged_in = False
+
+    def _comment(self, liked: int):
+        percentage = self.settings.get('set_do_comment', {}).get('percentage', 0)
+        self.commented += sum(
+            1 for _ in range(liked) if self.backend.rng.randint(1, 100) <= percentage
+        )
+
+    def like_by_feed(
+        self,
+        amount: int = 50,
+        randomize: bool = False,
+        unfollow: bool = False,
+        interact: bool = False,
+    ):
+        if self._call('like_by_feed'):
+            return self
+        self.liked_img += amount
+        self._comment(amount)
+        return self
+
+    def like_by_tags(
+        self,
+        tags: Sequence[str] = None,
+        use_random_tags: bool = False,
+        amount: int = 50,
+        skip_top_posts: bool = True,
+        use_smart_hashtags: bool = False,
+        use_smart_location_hashtags: bool = False,
+        interact: bool = False,
+        randomize: bool = False,
+        media: str = None,
+    ):
+        if self._call('like_by_tags'):
+            return self
+        liked = amount * len(tags or [])
+        self.liked_img += liked
+        self._comment(liked)
+        return self
+
+    def like_by_locations(
+        self,
+        locations: Sequence[str] = None,
+        amount: int = 50,
+        media: str = None,
+        skip_top_posts: bool = True,
+        randomize: bool = False,
+    ):
+        if self._call('like_by_locations'):
+            return self
+        self.liked_img += amount * len(locations or [])
+        return self
+
+    def follow_user_followers(
+        self,
+        usernames: Sequence[str],
+        amount: int = 10,
+        randomize: bool = False,
+        interact: bool = False,
+        sleep_delay: int = 600,
+    ):
+        if self._call('follow_user_followers', 'followed'):
+            return self
+        self.followed += amount * len(usernames or [])
+        return self
+
+    def unfollow_users(
+        self,
+        amount: int = 10,
+        custom_list_enabled: bool = False,
+        custom_list: Sequence[str] = None,
+        custom_list_param: str = 'all',
+        instapy_followed_enabled: bool = False,
+        instapy_followed_param: str = 'all',
+        nonFollowers: bool = False,
+        allFollowing: bool = False,
+        style: str = 'FIFO',
+        unfollow_after: int = None,
+        delay_followbackers: int = 0,
+        sleep_delay: int = 600,
+    ):
+        if self._call('unfollow_users', 'unfollowed'):
+            return self
+        if custom_list_enabled:
+            amount = min(amount, len(custom_list or []))
+        self.unfollowed += amount
+        return self
+
+
+class FakeBackend:
+    """Backend producing :class:`FakeInstaPy` sessions instead of a browser.
+
+    ``latency`` is either one number of seconds for every call or a mapping
+    from method name to seconds; ``failure_rate`` is the probability that a
+    call raises one of ``failures``. Latency is paid through ``clock`` when
+    given, so a ``VirtualClock`` makes it free in wall time.
+
+    ``script`` replaces all of this for engagement calls: each call takes
+    the next ``(seconds, failure or None, interactions)`` entry until the
+    script runs out, and each login takes the next of ``logins`` seconds.
+    """
+
+    def __init__(
+        self,
+        latency: Union[float, Dict[str, float]] = 0.0,
+        failure_rate: float = 0.0,
+        failures: Sequence[type] = (WebDriverException, TimeoutException),
+        clock=None,
+        seed: Optional[int] = None,
+        script: Sequence[Tuple[float, Optional[type], int]] = (),
+        logins: Sequence[float] = (),
+    ):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.failures = tuple(failures)
+        self.clock = clock
+        self.rng = random.Random(seed)
+        self.script = deque(script)
+        self.logins = deque(logins)
+        self.calls: Dict[str, int] = {}
+        self.sessions = []
+        self.latency_paid = 0.0
+
+    def next_call(self, name: str) -> Tuple[float, Optional[type], Optional[int]]:
+        if name == 'login' and self.logins:
+            return self.logins.popleft(), None, None
+        if self.script and name != 'login':
+            return self.script.popleft()
+        if isinstance(self.latency, dict):
+            delay = self.latency.get(name, 0.0)
+        else:
+            delay = self.latency
+        return delay, self.pick_failure(name), None
+
+    def pay(self, delay: float):
+        if delay <= 0:
+            return
+        self.latency_paid += delay
+        if self.clock is not None:
+            self.clock.sleep(delay)
+        else:
+            time_module.sleep(delay)
+
+    def pick_failure(self, name: str) -> Optional[type]:
+        if self.failure_rate <= 0 or name == 'login':
+            return None
+        if self.rng.random() < self.failure_rate:
+            return self.rng.choice(self.failures)
+        return None
+
+    def create_session(self, **kwargs) -> FakeInstaPy:
+        session = FakeInstaPy(self, **kwargs)
+        self.sessions.append(session)
+        logger.debug("Created fake session #%s", len(self.sessions))
+        return session
+
+    @staticmethod
+    @contextmanager
+    def smart_run(session: FakeInstaPy):
+        try:
+            session.login()
+            yield
+        finally:
+            session.end()